@@ -24,15 +24,107 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from db.database_manager import DatabaseManager
-from analyzers.llm_effectiveness_analyzer import LLMEffectivenessAnalyzer
-from analyzers.pattern_analyzer import OperationPatternAnalyzer
-from learning.learning_engine import LearningEngine
-from healing.self_healing_manager import SelfHealingManager
-from analytics.dashboard_generator import AnalyticsDashboard
+
+def _learning_engine(db):
+    from analyzers.llm_effectiveness_analyzer import LLMEffectivenessAnalyzer
+    from learning.learning_engine import LearningEngine
+    return LearningEngine(db, LLMEffectivenessAnalyzer(db))
+
+def _do_analyze(args, db):
+    from analyzers.llm_effectiveness_analyzer import LLMEffectivenessAnalyzer
+    result = LLMEffectivenessAnalyzer(db).process_unanalyzed_sessions(args.batch_size)
+    return {"sessions_analyzed": result}, f"✅ Analyzed {result} sessions"
+
+def _do_learn(args, db):
+    result = _learning_engine(db).run_learning_cycle(args.days)
+    return result, f"✅ Learning cycle complete: {result['sessions_analyzed']} sessions analyzed, {result['rules_updated']} rules updated"
+
+def _do_report(args, db):
+    from analyzers.llm_effectiveness_analyzer import LLMEffectivenessAnalyzer
+    result = LLMEffectivenessAnalyzer(db).generate_effectiveness_report(args.days)
+    return result, f"📊 Effectiveness report for last {args.days} days"
+
+def _do_status(args, db):
+    return _learning_engine(db).get_learning_status(), "📈 Learning system status"
+
+def _do_rules(args, db):
+    rules_path = Path.home() / '.claude' / 'context7_rules.json'
+    if rules_path.exists():
+        with open(rules_path, 'r') as f:
+            result = json.load(f)
+        return result, "📋 Current Context7 rules"
+    return {"error": "No rules file found"}, "❌ No rules file found at ~/.claude/context7_rules.json"
+
+def _do_tests(args, db):
+    result = _learning_engine(db).get_active_ab_tests()
+    return {"active_tests": result}, f"🧪 A/B Tests: {len(result)} active/completed"
+
+def _do_finalize(args, db):
+    result = _learning_engine(db).finalize_completed_tests()
+    return result, f"✅ Finalized {result['tests_finalized']} tests, adopted {result['rules_adopted_from_tests']} rules"
+
+def _do_health(args, db):
+    from healing.self_healing_manager import SelfHealingManager
+    result = SelfHealingManager(db).run_comprehensive_health_check()
+    health_status = result['overall_health']
+    health_icon = "✅" if health_status == "healthy" else "⚠️" if health_status == "minor_issues" else "❌"
+    return result, f"{health_icon} System health: {health_status}"
+
+def _do_heal(args, db):
+    from healing.self_healing_manager import SelfHealingManager
+    healing_manager = SelfHealingManager(db)
+    # Run healing and get updated health status
+    health_result = healing_manager.run_comprehensive_health_check()
+    healing_history = healing_manager.get_healing_history(1)  # Last 1 day
+    
+    output = {
+        "health_check": health_result,
+        "recent_healing": healing_history[-5:],  # Last 5 actions
+        "healing_stats": healing_manager.healing_stats
+    }
+    
+    total_issues = (
+        len(health_result["database_health"]["issues_found"]) +
+        len(health_result["cache_validation"]["issues_found"]) +
+        len(health_result["rules_validation"]["issues_found"])
+    )
+    
+    return output, f"🔧 Healing complete: {total_issues} issues found and addressed"
+
+def _do_dashboard(args, db):
+    from analyzers.llm_effectiveness_analyzer import LLMEffectivenessAnalyzer
+    from analyzers.pattern_analyzer import OperationPatternAnalyzer
+    from healing.self_healing_manager import SelfHealingManager
+    from analytics.dashboard_generator import AnalyticsDashboard
+    dashboard = AnalyticsDashboard(
+        db, LLMEffectivenessAnalyzer(db), OperationPatternAnalyzer(db), SelfHealingManager(db)
+    )
+    result = dashboard.generate_comprehensive_report(args.days)
+    
+    # Export HTML dashboard
+    html_path = Path.home() / '.claude' / 'context7_dashboard.html'
+    dashboard.export_dashboard_html(result, html_path)
+    
+    return result, f"📊 Dashboard generated: {html_path}"
+
+# Each command imports only the components it needs, so lightweight
+# commands like `rules` skip loading the analyzer stack entirely.
+COMMANDS = {
+    'analyze': _do_analyze,
+    'learn': _do_learn,
+    'report': _do_report,
+    'status': _do_status,
+    'rules': _do_rules,
+    'tests': _do_tests,
+    'finalize': _do_finalize,
+    'health': _do_health,
+    'heal': _do_heal,
+    'dashboard': _do_dashboard,
+}
 
 def main():
     parser = argparse.ArgumentParser(description="Context7 Learning & Analysis Tool")
-    parser.add_argument('command', choices=['analyze', 'learn', 'report', 'status', 'rules', 'tests', 'finalize', 'health', 'heal', 'dashboard'],
+    parser.add_argument('command', choices=list(COMMANDS),
                        help='Command to execute')
     parser.add_argument('--days', type=int, default=7,
                        help='Number of days to analyze (default: 7)')
@@ -43,91 +135,9 @@ def main():
     
     args = parser.parse_args()
     
-    # Initialize components
-    db = DatabaseManager()
-    analyzer = LLMEffectivenessAnalyzer(db)
-    pattern_analyzer = OperationPatternAnalyzer(db)
-    learning_engine = LearningEngine(db, analyzer)
-    healing_manager = SelfHealingManager(db)
-    dashboard = AnalyticsDashboard(db, analyzer, pattern_analyzer, healing_manager)
-    
     try:
-        if args.command == 'analyze':
-            result = analyzer.process_unanalyzed_sessions(args.batch_size)
-            output = {"sessions_analyzed": result}
-            message = f"✅ Analyzed {result} sessions"
-        
-        elif args.command == 'learn':
-            result = learning_engine.run_learning_cycle(args.days)
-            output = result
-            message = f"✅ Learning cycle complete: {result['sessions_analyzed']} sessions analyzed, {result['rules_updated']} rules updated"
-        
-        elif args.command == 'report':
-            result = analyzer.generate_effectiveness_report(args.days)
-            output = result
-            message = f"📊 Effectiveness report for last {args.days} days"
-        
-        elif args.command == 'status':
-            result = learning_engine.get_learning_status()
-            output = result
-            message = "📈 Learning system status"
-        
-        elif args.command == 'rules':
-            rules_path = Path.home() / '.claude' / 'context7_rules.json'
-            if rules_path.exists():
-                with open(rules_path, 'r') as f:
-                    result = json.load(f)
-                output = result
-                message = "📋 Current Context7 rules"
-            else:
-                output = {"error": "No rules file found"}
-                message = "❌ No rules file found at ~/.claude/context7_rules.json"
-        
-        elif args.command == 'tests':
-            result = learning_engine.get_active_ab_tests()
-            output = {"active_tests": result}
-            message = f"🧪 A/B Tests: {len(result)} active/completed"
-        
-        elif args.command == 'finalize':
-            result = learning_engine.finalize_completed_tests()
-            output = result
-            message = f"✅ Finalized {result['tests_finalized']} tests, adopted {result['rules_adopted_from_tests']} rules"
-        
-        elif args.command == 'health':
-            result = healing_manager.run_comprehensive_health_check()
-            output = result
-            health_status = result['overall_health']
-            health_icon = "✅" if health_status == "healthy" else "⚠️" if health_status == "minor_issues" else "❌"
-            message = f"{health_icon} System health: {health_status}"
-        
-        elif args.command == 'heal':
-            # Run healing and get updated health status
-            health_result = healing_manager.run_comprehensive_health_check()
-            healing_history = healing_manager.get_healing_history(1)  # Last 1 day
-            
-            output = {
-                "health_check": health_result,
-                "recent_healing": healing_history[-5:],  # Last 5 actions
-                "healing_stats": healing_manager.healing_stats
-            }
-            
-            total_issues = (
-                len(health_result["database_health"]["issues_found"]) +
-                len(health_result["cache_validation"]["issues_found"]) +
-                len(health_result["rules_validation"]["issues_found"])
-            )
-            
-            message = f"🔧 Healing complete: {total_issues} issues found and addressed"
-        
-        elif args.command == 'dashboard':
-            result = dashboard.generate_comprehensive_report(args.days)
-            output = result
-            
-            # Export HTML dashboard
-            html_path = Path.home() / '.claude' / 'context7_dashboard.html'
-            dashboard.export_dashboard_html(result, html_path)
-            
-            message = f"📊 Dashboard generated: {html_path}"
+        db = None if args.command == 'rules' else DatabaseManager()
+        output, message = COMMANDS[args.command](args, db)
         
         # Output results
         if args.format == 'json':
@@ -2,49 +2,218 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 #     "supabase",
 # ]
 # ///
+import atexit
 import json
+import os
+import pickle
+import queue
 import sys
 import re
 import signal
-import uuid
+import socket
+import subprocess
+import threading
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    orjson = None
+
+PROJECT_DIR = Path(__file__).parent
+CLAUDE_DIR = Path.home() / '.claude'
+RULES_PATH = CLAUDE_DIR / 'context7_rules.json'
+DEBUG_LOG = CLAUDE_DIR / 'hook_debug.log'
+ERROR_LOG = CLAUDE_DIR / 'hook_errors.log'
+CACHE_UTILS_PATH = PROJECT_DIR / 'scripts' / 'cache_utils.py'
+VALIDATE_CACHE_PATH = PROJECT_DIR / 'scripts' / 'validate_cache.py'
+
 # Add project src to the Python path
-sys.path.insert(0, str(Path(__file__).parent / 'src'))
+sys.path.insert(0, str(PROJECT_DIR / 'src'))
+
+def _json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _json_dumps(obj) -> bytes:
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+def _emit(output: dict):
+    """Writes the hook's JSON decision to stdout."""
+    sys.stdout.buffer.write(_json_dumps(output) + b"\n")
+    sys.stdout.flush()
+
+# Set CONTEXT7_HOOK_DAEMON=1 to forward hook calls (this hook and the intelligent
+# PostToolUse hook) to a long-lived context7_hookd.py
+# process (spawned on demand) instead of paying interpreter and import cost per call
+USE_DAEMON = os.environ.get('CONTEXT7_HOOK_DAEMON') == '1'
+DAEMON_SOCKET = CLAUDE_DIR / 'context7_hook.sock'
+HOOK_TIMEOUT = 55
+
+# Set CONTEXT7_HOOK_DEBUG=0 to skip writing ~/.claude/hook_debug.log
+DEBUG = os.environ.get('CONTEXT7_HOOK_DEBUG', '1') != '0'
 
-from db.database_manager import DatabaseManager
-from extractors.basic_extractor import BasicSectionExtractor
-from detectors.operation_detector import OperationDetector
+# Upper bound on waiting for the background session-log write before exiting;
+# matches the SQLite busy_timeout so a contended write still gets to finish.
+LOG_FLUSH_TIMEOUT = 5.0
+
+_CACHE_KEY_RE = re.compile(r'[a-zA-Z0-9:._-]+')
+_MCP_WRITE_TOOL_RE = re.compile(r'mcp__.*__(write|edit|multi_edit)')
+_WRITE_TOOLS = frozenset({'Write', 'Edit', 'MultiEdit'})
+_CODE_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.py', '.html', '.css')
+
+# Parsed rules keyed by (path, mtime_ns). Each hook run is a fresh process, so
+# the parsed dict is also persisted to a pickle sidecar next to the rules file.
+_RULES_CACHE = {'path': None, 'mtime': 0, 'data': None}
+
+def _load_rules(rules_path: Path, mtime_ns: int) -> dict:
+    if _RULES_CACHE['path'] == rules_path and _RULES_CACHE['mtime'] == mtime_ns:
+        return _RULES_CACHE['data']
+
+    sidecar = rules_path.parent / '.context7_rules.cache.pkl'
+    rules = None
+    try:
+        with open(sidecar, 'rb') as f:
+            cached_mtime, cached_rules = pickle.load(f)
+        if cached_mtime == mtime_ns:
+            rules = cached_rules
+    except Exception:
+        pass
+
+    if rules is None:
+        with open(rules_path, 'r') as f:
+            rules = json.load(f)
+        try:
+            with open(sidecar, 'wb') as f:
+                pickle.dump((mtime_ns, rules), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+
+    _RULES_CACHE.update(path=rules_path, mtime=mtime_ns, data=rules)
+    return rules
 
 def get_extraction_rule(framework: str, operation: str) -> dict:
-    # (No changes needed here, previous version was already robust)
-    rules_path = Path.home() / '.claude' / 'context7_rules.json'
     fallback_rule = {"sections": ["overview", "example"], "max_tokens": 2000}
-    if not rules_path.exists():
+    try:
+        mtime_ns = RULES_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
         return fallback_rule
-    with open(rules_path, 'r') as f:
-        rules = json.load(f)
+    rules = _load_rules(RULES_PATH, mtime_ns)
     framework_rules = rules.get(framework, {})
     return framework_rules.get(operation, framework_rules.get('defaults', rules.get('defaults', fallback_rule)))
 
+def _tail_jsonl(path: str, n: int = 10, needles: tuple = ()) -> list:
+    """Parses only the last `n` records of a JSONL file by reading backwards from EOF.
+
+    Only lines containing every byte string in `needles` are parsed; if the tail
+    window doesn't contain all of them, nothing is split or parsed at all.
+    """
+    window = 64 * 1024
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        while True:
+            start = max(0, size - window)
+            f.seek(start)
+            data = f.read(size - start)
+            # n + 1 newlines guarantees n complete lines even if the first is partial
+            if data.count(b'\n') > n or start == 0:
+                break
+            window *= 4
+
+    if not all(needle in data for needle in needles):
+        return []
+
+    lines = data.split(b'\n')
+    if start > 0:
+        lines = lines[1:]  # First fragment may be a partial line
+    lines = [line for line in lines if line.strip()]
+
+    records = []
+    for line in lines[-n:]:
+        if not all(needle in line for needle in needles):
+            continue
+        try:
+            records.append(_json_loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
 class Context7CacheHook:
     """A hook to enforce using cached documentation via Context7."""
     
     def __init__(self):
+        # Imported here so the thin daemon client path never loads them
+        from db.database_manager import DatabaseManager
+        from extractors.basic_extractor import BasicSectionExtractor
+        from detectors.operation_detector import OperationDetector
+
         self.db = DatabaseManager()
         self.extractor = BasicSectionExtractor()
         self.detector = OperationDetector()
+        self._debug_lines = []
+        self._log_queue = queue.Queue()
+        self._log_thread = None
+        if DEBUG:
+            # process() ends via sys.exit, so flush any buffered lines at interpreter exit
+            atexit.register(self._flush_debug)
+
+    def _debug(self, message: str):
+        """Buffers a debug log line; written out in a single append by _flush_debug."""
+        if DEBUG:
+            self._debug_lines.append(f"[{datetime.now().isoformat()}] {message}\n")
+
+    def _flush_debug(self):
+        if not self._debug_lines:
+            return
+        # Swap first: the session-log worker may append while we write
+        lines, self._debug_lines = self._debug_lines, []
+        with open(DEBUG_LOG, 'a') as f:
+            f.writelines(lines)
+
+    def _log_session_async(self, *args):
+        """Queues a DatabaseManager.log_session call for the background writer."""
+        if self._log_thread is None:
+            self._log_thread = threading.Thread(target=self._log_worker, daemon=True)
+            self._log_thread.start()
+        self._log_queue.put(args)
+
+    def _log_worker(self):
+        while True:
+            args = self._log_queue.get()
+            if args is None:
+                return
+            try:
+                self.db.log_session(*args)
+            except Exception as e:
+                self._debug(f"Session log write failed: {e}")
+
+    def _finish_logging(self):
+        """Waits (bounded) for queued session logs once the response has been emitted."""
+        if self._log_thread is None:
+            return
+        self._log_queue.put(None)
+        self._log_thread.join(LOG_FLUSH_TIMEOUT)
+
+    def _detect(self, content: str, file_path: str) -> tuple:
+        """Returns (framework, operation, component); the last two only when a framework is found."""
+        framework = self.detector.detect_framework(content, file_path)
+        if not framework:
+            return None, None, None
+        operation_type = self.detector.detect_operation(content, file_path)
+        component = self.detector.extract_component(content, file_path, framework)
+        return framework, operation_type, component
 
     def _sanitize_cache_key(self, key: str) -> str:
         """(Point 2) Sanitize cache keys to prevent injection attacks."""
         if '..' in key or key.startswith('/'):
             raise ValueError(f"Invalid cache key: path traversal attempt blocked.")
-        if not re.match(r'^[a-zA-Z0-9:._-]+$', key):
+        if not _CACHE_KEY_RE.fullmatch(key):
             raise ValueError(f"Invalid cache key format: contains invalid characters.")
         return key
 
@@ -56,7 +225,7 @@ class Context7CacheHook:
         if len(content.strip()) < 50:
             return True
         # Bypass for non-code files
-        if file_path and not any(file_path.endswith(ext) for ext in ['.js', '.jsx', '.ts', '.tsx', '.py', '.html', '.css']):
+        if file_path and not file_path.endswith(_CODE_EXTENSIONS):
             return True
         return False
     
@@ -66,22 +235,15 @@ class Context7CacheHook:
             if not transcript_path or not Path(transcript_path).exists():
                 return False
             
-            # Read the transcript (JSONL format - one JSON object per line)
-            messages = []
-            with open(transcript_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            messages.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            continue
-            
-            if len(messages) < 2:
-                return False
+            # Parse only the tail of the transcript (JSONL format - one JSON object per line),
+            # skipping lines that can't be one of our context provisions for this cache key
+            messages = _tail_jsonl(transcript_path, 10, (
+                f"Cache Key: {cache_key}".encode(),
+                b"I have retrieved relevant documentation",
+            ))
             
             # Check the last 10 messages for our hook providing context
-            for msg in messages[-10:]:
+            for msg in messages:
                 # Look for user messages that contain tool_result with our hook error
                 if msg.get('type') == 'user' and msg.get('message', {}).get('role') == 'user':
                     content_array = msg.get('message', {}).get('content', [])
@@ -94,26 +256,29 @@ class Context7CacheHook:
                                 if (f"Cache Key: {cache_key}" in error_content and 
                                     "I have retrieved relevant documentation" in error_content):
                                     # Debug log that we found a match
-                                    debug_log = Path.home() / '.claude' / 'hook_debug.log'
-                                    with open(debug_log, 'a') as f:
-                                        f.write(f"[{datetime.now().isoformat()}] Found previous context provision for {cache_key}\n")
+                                    self._debug(f"Found previous context provision for {cache_key}")
                                     return True
             
             return False
             
         except Exception as e:
             # Log error but don't block on transcript reading failures
-            debug_log = Path.home() / '.claude' / 'hook_debug.log'
-            with open(debug_log, 'a') as f:
-                f.write(f"[{datetime.now().isoformat()}] Transcript read error: {e}\n")
+            self._debug(f"Transcript read error: {e}")
             return False
 
     def process(self, input_data: dict):
         """Processes the hook input and directs Claude using JSON output."""
+        output = self.decide(input_data)
+        if output is not None:
+            _emit(output)
+        self._finish_logging()
+        sys.exit(0)
+
+    def decide(self, input_data: dict):
+        """Returns the hook's JSON decision, or None to approve without changes."""
         # Debug log
-        debug_log = Path.home() / '.claude' / 'hook_debug.log'
-        with open(debug_log, 'a') as f:
-            f.write(f"[{datetime.now().isoformat()}] Hook called with: {json.dumps(input_data)[:200]}\n")
+        if DEBUG:
+            self._debug(f"Hook called with: {_json_dumps(input_data)[:200].decode(errors='ignore')}")
         
         tool_name = input_data.get('tool_name')
         tool_input = input_data.get('tool_input', {})
@@ -121,52 +286,44 @@ class Context7CacheHook:
         
         # (Point 7) Rules file management command
         if tool_input.get('command') == 'context7-rules':
-            rules_path = Path.home() / '.claude' / 'context7_rules.json'
-            output = rules_path.read_text() if rules_path.exists() else "No context7_rules.json file found."
-            print(json.dumps({"decision": "block", "reason": output}))
-            sys.exit(0)
+            output = RULES_PATH.read_text() if RULES_PATH.exists() else "No context7_rules.json file found."
+            return {"decision": "block", "reason": output}
 
         # (Point 5) MCP and standard tool integration
-        is_valid_tool = (tool_name in ['Write', 'Edit', 'MultiEdit']) or \
-                        (re.match(r'mcp__.*__(write|edit|multi_edit)', tool_name or ""))
+        is_valid_tool = (tool_name in _WRITE_TOOLS) or \
+                        (tool_name and _MCP_WRITE_TOOL_RE.match(tool_name))
         if not is_valid_tool:
-            sys.exit(0) # Approve without changes
+            return None # Approve without changes
 
         # (Point 6) Performance bypass
         if self._should_bypass(tool_input):
-            sys.exit(0) # Approve without changes
+            return None # Approve without changes
 
         content = tool_input.get('content', '')
         file_path = tool_input.get('file_path', '')
 
-        framework = self.detector.detect_framework(content, file_path)
+        framework, operation_type, component = self._detect(content, file_path)
         if not framework:
-            sys.exit(0) # Approve without changes
-
-        operation_type = self.detector.detect_operation(content, file_path)
-        component = self.detector.extract_component(content, file_path, framework)
+            return None # Approve without changes
         
         try:
             raw_key = f"{framework}:{component}" if component else framework
             cache_key = self._sanitize_cache_key(raw_key) # (Point 2)
         except ValueError as e:
-            print(json.dumps({"decision": "block", "reason": f"Error: {e}"}))
-            sys.exit(0)
+            return {"decision": "block", "reason": f"Error: {e}"}
 
         # Check if we recently provided context for this exact operation
         if transcript_path and self._check_transcript_for_recent_context(transcript_path, cache_key, file_path):
             # We already provided context in a recent turn, allow the operation
-            debug_log = Path.home() / '.claude' / 'hook_debug.log'
-            with open(debug_log, 'a') as f:
-                f.write(f"[{datetime.now().isoformat()}] Allowing operation - context already provided for {cache_key}\n")
-            sys.exit(0)  # Approve without changes
+            self._debug(f"Allowing operation - context already provided for {cache_key}")
+            return None  # Approve without changes
 
         cached_data = self.db.get_cache_data(cache_key)
         rule = get_extraction_rule(framework, operation_type)
 
         # (Point 4) Use structured JSON output for control flow
         if cached_data:
-            sections = json.loads(cached_data['sections'])
+            sections = _json_loads(cached_data['sections'])
             extracted_content, sections_used = self.extractor.extract_relevant_sections(
                 sections, rule, token_budget=rule.get('max_tokens', 2000)
             )
@@ -175,15 +332,15 @@ class Context7CacheHook:
             if not extracted_content and cached_data.get('full_content'):
                 extracted_content = cached_data['full_content'][:rule.get('max_tokens', 2000) * 5]  # Approx 5 chars per token
                 sections_used = list(sections.keys()) if sections else ['full_content']
-                debug_log = Path.home() / '.claude' / 'hook_debug.log'
-                with open(debug_log, 'a') as f:
-                    f.write(f"[{datetime.now().isoformat()}] No matching sections found for {cache_key}, using full content\n")
+                self._debug(f"No matching sections found for {cache_key}, using full content")
             
             # Log session for effectiveness analysis
-            session_id = str(uuid.uuid4())[:8]  # Short session ID
-            log_id = self.db.log_session(
+            session_id = os.urandom(4).hex()  # Short session ID (8 hex chars)
+            # Written in the background so the DB write isn't on the response path.
+            # tokens_used is approximate (~4 chars per token) to avoid splitting the content.
+            self._log_session_async(
                 session_id, cache_key, operation_type, sections_used,
-                len(extracted_content.split()), tool_name, tool_input, file_path
+                len(extracted_content) // 4, tool_name, tool_input, file_path
             )
             
             # Block and provide the context in the reason for the model to use
@@ -194,8 +351,7 @@ class Context7CacheHook:
             reason = self._format_fetch_instructions(framework, rule, cache_key)
             output = {"decision": "block", "reason": reason}
 
-        print(json.dumps(output))
-        sys.exit(0)
+        return output
 
     def _format_response(self, framework: str, content: str, cache_key: str, sections_used: list, session_id: str) -> str:
         return f"""I have retrieved relevant documentation for {framework} from the cache. Please use this context to inform your code generation.
@@ -211,7 +367,6 @@ Sections Used: {', '.join(sections_used)}
 
     def _format_fetch_instructions(self, framework: str, rule: dict, cache_key: str) -> str:
         sections_to_extract = rule.get('sections', ['overview', 'example', 'usage', 'api'])
-        cache_utils_path = Path(__file__).parent / "scripts" / "cache_utils.py"
         return f"""The required {framework} documentation is not in the cache. To proceed:
 
 1. Use Context7:get-library-docs to fetch the documentation for '{framework}'
@@ -227,40 +382,94 @@ Sections Used: {', '.join(sections_used)}
    Content here...
 
 3. Cache using one of these methods:
-   - With content: uv run {cache_utils_path} cache "{cache_key}" "{framework}" --content "YOUR_CONTENT"
-   - With stdin (for large content): echo "YOUR_CONTENT" | uv run {cache_utils_path} cache "{cache_key}" "{framework}"
+   - With content: uv run {CACHE_UTILS_PATH} cache "{cache_key}" "{framework}" --content "YOUR_CONTENT"
+   - With stdin (for large content): echo "YOUR_CONTENT" | uv run {CACHE_UTILS_PATH} cache "{cache_key}" "{framework}"
    
-4. Validate the cache: uv run {Path(__file__).parent / "scripts" / "validate_cache.py"} "{cache_key}"
+4. Validate the cache: uv run {VALIDATE_CACHE_PATH} "{cache_key}"
 
 5. Retry your original request
 
 Note: The cache_utils.py script stores documentation in SQLite with section extraction and analytics tracking.
 """
 
+def _log_hook_error(e: Exception):
+    """Logs an unexpected hook failure without blocking Claude."""
+    with open(ERROR_LOG, 'a') as f:
+        f.write(f"[{datetime.now().isoformat()}] {type(e).__name__}: {e}\n")
+
+def _spawn_daemon():
+    """Starts context7_hookd.py detached; it exits on its own if one is already running."""
+    subprocess.Popen(
+        [sys.executable, str(PROJECT_DIR / 'context7_hookd.py')],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+# Request tags telling the daemon which hook a forwarded payload belongs to
+DAEMON_CACHE_HOOK = b'C'
+DAEMON_POSTTOOLUSE_HOOK = b'I'
+
+def forward_to_daemon(hook_tag: bytes, payload: bytes):
+    """Sends the raw hook input to the daemon and returns its reply.
+
+    The request is a one-byte hook tag followed by the payload. The reply is a
+    status byte (b'0' or b'1', the exit code) followed by the bytes to write to
+    stdout or stderr respectively. Returns None when no daemon answered, after
+    spawning one for subsequent calls.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(HOOK_TIMEOUT)
+    try:
+        sock.connect(str(DAEMON_SOCKET))
+    except OSError:
+        sock.close()
+        _spawn_daemon()
+        return None
+    with sock:
+        sock.sendall(hook_tag + payload)
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return b''.join(chunks) or None
+
+def _timeout_handler(signum, frame):
+    # This error won't be seen by the user, but will be in the log.
+    raise TimeoutError("Hook script timed out after 55 seconds.")
+
 def main():
     """Main entry point for the hook script with robust error handling."""
-    # (Point 8) Timeout to prevent hanging
-    def timeout_handler(signum, frame):
-        # This error won't be seen by the user, but will be in the log.
-        raise TimeoutError("Hook script timed out after 55 seconds.")
-    
-    signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(55)
-
     # (Point 3) Better error handling
     try:
-        input_data = json.load(sys.stdin)
-        hook = Context7CacheHook()
-        hook.process(input_data)
+        payload = sys.stdin.buffer.read()
+        if USE_DAEMON:
+            reply = forward_to_daemon(DAEMON_CACHE_HOOK, payload)
+            if reply is not None:
+                status, body = reply[:1], reply[1:]
+                (sys.stdout if status == b'0' else sys.stderr).buffer.write(body)
+                sys.exit(int(status))
+            # No daemon was running yet: handle this call in-process
+        input_data = _json_loads(payload)
+
+        # (Point 8) Timeout to prevent hanging, armed only around the actual work
+        # (SIGALRM is POSIX-only)
+        has_alarm = hasattr(signal, 'SIGALRM')
+        if has_alarm:
+            signal.signal(signal.SIGALRM, _timeout_handler)
+            signal.alarm(HOOK_TIMEOUT)
+        try:
+            hook = Context7CacheHook()
+            hook.process(input_data)
+        finally:
+            if has_alarm:
+                signal.alarm(0)
     except json.JSONDecodeError as e:
         # This error indicates a problem with Claude's output to the hook.
         print(f"Hook Error: Invalid JSON input from stdin: {e}", file=sys.stderr)
         sys.exit(1)  # Non-blocking error code
     except Exception as e:
         # Log other errors to a file for debugging but don't block Claude.
-        log_path = Path.home() / '.claude' / 'hook_errors.log'
-        with open(log_path, 'a') as f:
-            f.write(f"[{datetime.now().isoformat()}] {type(e).__name__}: {e}\n")
+        _log_hook_error(e)
         sys.exit(0) # Let Claude continue without intervention
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "orjson",
+#     "python-dotenv",
+#     "supabase",
+# ]
+# ///
+"""
+Context7 hook daemon
+
+Keeps a Context7CacheHook (database manager, detector, extractor, parsed
+rules) and an IntelligentPostToolUseHook alive between hook calls and serves
+them over a Unix socket at ~/.claude/context7_hook.sock. Started on demand by
+either hook when CONTEXT7_HOOK_DAEMON=1; exits after IDLE_TIMEOUT seconds
+without calls.
+
+PreToolUse calls are answered on the main thread, each bounded by
+DECIDE_TIMEOUT. PostToolUse analysis is queued to a worker thread so it
+never delays them.
+"""
+
+import fcntl
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from context7_cache_hook import (
+    Context7CacheHook, CLAUDE_DIR, DAEMON_SOCKET, HOOK_TIMEOUT,
+    DAEMON_CACHE_HOOK, DAEMON_POSTTOOLUSE_HOOK,
+    _json_dumps, _json_loads, _log_hook_error,
+)
+from intelligent_posttooluse_hook import IntelligentPostToolUseHook
+from analyzers.intelligent_session_analyzer import RULES_FLUSH_INTERVAL
+
+PID_FILE = CLAUDE_DIR / 'context7_hookd.pid'
+IDLE_TIMEOUT = 30 * 60
+# A decision that takes longer fails open, leaving the client time to read the reply
+# before its own HOOK_TIMEOUT
+DECIDE_TIMEOUT = HOOK_TIMEOUT - 5
+
+def _decide_timeout_handler(signum, frame):
+    raise TimeoutError(f"Hook decision timed out after {DECIDE_TIMEOUT} seconds.")
+
+def handle_payload(hook: Context7CacheHook, payload: bytes) -> bytes:
+    """Runs one hook call, mirroring context7_cache_hook.main()'s exit behaviour."""
+    try:
+        input_data = _json_loads(payload)
+    except json.JSONDecodeError as e:
+        return b'1' + f"Hook Error: Invalid JSON input from stdin: {e}\n".encode()
+
+    # Requests are served on the main thread, where SIGALRM is delivered
+    signal.alarm(DECIDE_TIMEOUT)
+    try:
+        output = hook.decide(input_data)
+    except Exception as e:
+        _log_hook_error(e)
+        return b'0'
+    finally:
+        signal.alarm(0)
+        hook._flush_debug()
+
+    return b'0' + (_json_dumps(output) + b'\n' if output is not None else b'')
+
+class HookRequestHandler(socketserver.StreamRequestHandler):
+    timeout = HOOK_TIMEOUT
+
+    def handle(self):
+        # The client half-closes after sending, so read() returns the whole request
+        request = self.rfile.read()
+        hook_tag, payload = request[:1], request[1:]
+
+        if hook_tag == DAEMON_CACHE_HOOK:
+            self.wfile.write(handle_payload(self.server.hook, payload))
+        elif hook_tag == DAEMON_POSTTOOLUSE_HOOK:
+            # PostToolUse output is ignored, so release the client and analyze later
+            self.server.posttooluse_queue.put(payload)
+            self.wfile.write(b'0')
+
+class HookServer(socketserver.UnixStreamServer):
+    timeout = IDLE_TIMEOUT
+
+    def __init__(self, path: Path):
+        self.hook = Context7CacheHook()
+        self.posttooluse_hook = IntelligentPostToolUseHook()
+        self.posttooluse_queue = queue.Queue()
+        self.posttooluse_thread = threading.Thread(target=self._posttooluse_worker, daemon=True)
+        self.posttooluse_thread.start()
+        self.idle = False
+        super().__init__(str(path), HookRequestHandler)
+        os.chmod(path, 0o600)
+
+    def _posttooluse_worker(self):
+        """Runs queued PostToolUse payloads; the only thread that touches the analyzer."""
+        analyzer = self.posttooluse_hook.analyzer
+        try:
+            while True:
+                # Wake up to write deferred rule updates instead of holding them until the next call
+                timeout = RULES_FLUSH_INTERVAL if analyzer.has_pending_rules() else None
+                try:
+                    payload = self.posttooluse_queue.get(timeout=timeout)
+                except queue.Empty:
+                    try:
+                        analyzer.flush_rules()
+                    except Exception as e:
+                        _log_hook_error(e)
+                    continue
+                if payload is None:
+                    return
+                try:
+                    self.posttooluse_hook.handle(_json_loads(payload))
+                except Exception as e:
+                    _log_hook_error(e)
+        finally:
+            analyzer.close()
+
+    def stop_posttooluse_worker(self):
+        """Lets the worker finish queued analyses and write pending rules (bounded)."""
+        self.posttooluse_queue.put(None)
+        self.posttooluse_thread.join(HOOK_TIMEOUT)
+
+    def handle_timeout(self):
+        self.idle = True
+
+def main():
+    PID_FILE.parent.mkdir(parents=True, exist_ok=True)
+    pid_file = open(PID_FILE, 'a+')
+    try:
+        fcntl.flock(pid_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit(0)  # Another daemon already owns the socket
+    pid_file.truncate(0)
+    pid_file.write(str(os.getpid()))
+    pid_file.flush()
+
+    # Exit through the finally block below so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGALRM, _decide_timeout_handler)
+
+    DAEMON_SOCKET.unlink(missing_ok=True)
+    server = HookServer(DAEMON_SOCKET)
+    try:
+        while not server.idle:
+            server.handle_request()
+    finally:
+        server.stop_posttooluse_worker()
+        server.server_close()
+        DAEMON_SOCKET.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Script to enable/disable the intelligent autonomous learning mode.
 """
 
 import json
+import os
 import shutil
 from pathlib import Path
 import sys
@@ -26,6 +27,21 @@ def get_hook_config_path():
     default_path.parent.mkdir(parents=True, exist_ok=True)
     return default_path
 
+def save_hook_config(config_path: Path, config: dict) -> bool:
+    """Atomically writes the hook config. Returns False if it was already up to date."""
+    new_text = json.dumps(config, indent=2)
+    if config_path.exists() and config_path.read_text() == new_text:
+        return False
+    
+    # Write to a temp file and swap it in so an interrupted write can't corrupt the config
+    tmp_path = config_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(new_text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, config_path)
+    return True
+
 def enable_intelligent_mode():
     """Switch to the intelligent PostToolUse hook."""
     
@@ -56,10 +72,10 @@ def enable_intelligent_mode():
     }
     
     # Save updated config
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
-    
-    print(f"✅ Updated hook configuration at: {config_path}")
+    if save_hook_config(config_path, config):
+        print(f"✅ Updated hook configuration at: {config_path}")
+    else:
+        print(f"✅ Hook configuration already up to date: {config_path}")
     print(f"✅ PostToolUse now uses: {intelligent_hook_path}")
     
     # Show what changed
@@ -93,8 +109,7 @@ def disable_intelligent_mode():
                 'description': 'Session outcome tracker'
             }
             
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            save_hook_config(config_path, config)
             
             print(f"✅ Reverted to old hook: {old_hook_path}")
     
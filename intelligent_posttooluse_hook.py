@@ -7,44 +7,106 @@ autonomously updates rules based on actual effectiveness.
 import json
 import sys
 import os
+import re
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
+
+try:
+    import orjson
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    orjson = None
 
 # Add the project root to Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / 'src'))
 
-from db.database_manager import DatabaseManager
-from analyzers.intelligent_session_analyzer import IntelligentSessionAnalyzer
+# Same switch as the PreToolUse hook; the daemon client is only imported when it's on
+USE_DAEMON = os.environ.get('CONTEXT7_HOOK_DAEMON') == '1'
+
+# Markers the PreToolUse cache hook writes into its block reason
+SESSION_RE = re.compile(r'Session:\s*([a-f0-9-]{8})')
+CACHE_KEY_RE = re.compile(r'Cache Key:\s*([^\s|]+)')
+
+# Tools this hook analyzes (Write, Edit, Context7 operations)
+RELEVANT_TOOLS = frozenset({
+    'Write', 'Edit', 'MultiEdit', 'Bash',
+    'mcp__Context7__get-library-docs',
+    'mcp__Context7__cache-context'
+})
+
+# Columns the analyzer and session-log update actually read; tool_input (which
+# carries the full written file content) is deliberately left out
+SESSION_FIELDS = ('log_id', 'session_id', 'cache_key', 'operation_type',
+                  'sections_provided', 'tokens_used', 'tool_name', 'file_path')
+SESSION_COLUMNS = ', '.join(SESSION_FIELDS)
+
+# File path keywords used to infer user intent, in priority order
+INTENT_MESSAGES = {
+    'redis': "Working with Redis configuration or setup",
+    'api': "Creating or modifying API endpoints",
+    'database': "Database-related operations",
+}
+INTENT_RE = re.compile('|'.join(INTENT_MESSAGES), re.IGNORECASE)
+
+# How much of the end of a transcript _parse_transcript reads
+TRANSCRIPT_TAIL_BYTES = 64 * 1024
+
+CLAUDE_DIR = Path.home() / '.claude'
+TRANSCRIPT_DIR = CLAUDE_DIR / 'conversations'
+# Error log shared with the PreToolUse cache hook
+ERROR_LOG = CLAUDE_DIR / 'hook_errors.log'
+_ERR_FD = None
+
+def _ts() -> str:
+    """Local timestamp for log lines, to the second."""
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+def _log_error(msg: str):
+    """Appends one line to the hook error log with a single write."""
+    global _ERR_FD
+    if _ERR_FD is None:
+        # Opened on first error and kept for the life of the process (or daemon);
+        # O_APPEND keeps lines from concurrent hooks intact
+        _ERR_FD = os.open(ERROR_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    os.write(_ERR_FD, f"[{_ts()}] {msg}\n".encode())
 
 class IntelligentPostToolUseHook:
     def __init__(self):
+        # Imported here so the thin daemon client path never loads them
+        from db.database_manager import DatabaseManager
+        from analyzers.intelligent_session_analyzer import IntelligentSessionAnalyzer
+
         self.db = DatabaseManager()
         self.analyzer = IntelligentSessionAnalyzer()
-        self.transcript_dir = Path.home() / '.claude' / 'conversations'
+        self.transcript_dir = TRANSCRIPT_DIR
         
     def process(self, input_data: dict):
         """Main processing logic for PostToolUse events."""
+        self.handle(input_data)
+        sys.exit(0)
+    
+    def handle(self, input_data: dict):
+        """Analyzes one PostToolUse event; never raises and never exits."""
         
         try:
             tool_name = input_data.get('tool_name', '')
-            tool_response = input_data.get('tool_response', {})
             
             # Only process relevant tools (Write, Edit, Context7 operations)
-            if not self._is_relevant_tool(tool_name):
-                sys.exit(0)
+            if tool_name not in RELEVANT_TOOLS:
+                return
             
             # Extract session information
             session_data = self._extract_session_data(input_data)
             if not session_data:
-                sys.exit(0)
+                return
             
-            # Get conversation context
-            conversation_context = self._get_conversation_context(input_data)
-            
-            # Add conversation context to session data
-            session_data['conversation_context'] = conversation_context
+            # Get conversation context, stored straight into the session data
+            conversation_context = session_data['conversation_context'] = \
+                self._get_conversation_context(input_data)
             
             # Analyze and potentially update rules immediately
             analysis = self.analyzer.analyze_session_with_llm(session_data, conversation_context)
@@ -59,20 +121,11 @@ class IntelligentPostToolUseHook:
             
         except Exception as e:
             # Log error but don't disrupt workflow
-            error_log = Path.home() / '.claude' / 'hook_errors.log'
-            with open(error_log, 'a') as f:
-                f.write(f"[{datetime.now().isoformat()}] IntelligentPostToolUse error: {e}\n")
-        
-        sys.exit(0)
+            _log_error(f"IntelligentPostToolUse error: {e}")
     
     def _is_relevant_tool(self, tool_name: str) -> bool:
         """Check if this tool is relevant for intelligent analysis."""
-        relevant_tools = [
-            'Write', 'Edit', 'MultiEdit', 'Bash',
-            'mcp__Context7__get-library-docs',
-            'mcp__Context7__cache-context'
-        ]
-        return tool_name in relevant_tools
+        return tool_name in RELEVANT_TOOLS
     
     def _extract_session_data(self, input_data: dict) -> dict:
         """Extract session data from the PostToolUse input."""
@@ -82,23 +135,12 @@ class IntelligentPostToolUseHook:
         output = tool_response.get('output', '')
         
         # Try to find session ID and cache key from the output
-        session_id = None
-        cache_key = None
-        
-        # Look for patterns in the output
-        if 'Session:' in str(output):
-            # Extract session ID
-            import re
-            match = re.search(r'Session:\s*([a-f0-9-]{8})', str(output))
-            if match:
-                session_id = match.group(1)
-        
-        if 'Cache Key:' in str(output):
-            # Extract cache key
-            import re
-            match = re.search(r'Cache Key:\s*([^\s|]+)', str(output))
-            if match:
-                cache_key = match.group(1)
+        if not isinstance(output, str):
+            output = str(output)
+        session_match = SESSION_RE.search(output)
+        session_id = session_match.group(1) if session_match else None
+        cache_key_match = CACHE_KEY_RE.search(output)
+        cache_key = cache_key_match.group(1) if cache_key_match else None
         
         if not (session_id and cache_key):
             # Try to get from database by looking at recent sessions
@@ -109,15 +151,16 @@ class IntelligentPostToolUseHook:
         
         # Get full session data from database
         with self.db.get_connection() as conn:
-            row = conn.execute('''
-                SELECT * FROM session_logs 
+            conn.row_factory = None  # Plain tuples, zipped straight into the dict below
+            row = conn.execute(f'''
+                SELECT {SESSION_COLUMNS} FROM session_logs 
                 WHERE session_id = ? AND cache_key = ?
                 ORDER BY timestamp DESC 
                 LIMIT 1
             ''', (session_id, cache_key)).fetchone()
             
             if row:
-                return dict(row)
+                return dict(zip(SESSION_FIELDS, row))
         
         return None
     
@@ -125,16 +168,17 @@ class IntelligentPostToolUseHook:
         """Get the most recent relevant session from the database."""
         try:
             with self.db.get_connection() as conn:
+                conn.row_factory = None
                 # Get the most recent unanalyzed session
-                row = conn.execute('''
-                    SELECT * FROM session_logs 
+                row = conn.execute(f'''
+                    SELECT {SESSION_COLUMNS} FROM session_logs 
                     WHERE session_complete IS NULL 
                     ORDER BY timestamp DESC 
                     LIMIT 1
                 ''').fetchone()
                 
                 if row:
-                    return dict(row)
+                    return dict(zip(SESSION_FIELDS, row))
         except Exception:
             pass
         
@@ -152,8 +196,10 @@ class IntelligentPostToolUseHook:
         
         # Try to read from transcript if available
         transcript_path = input_data.get('transcript_path')
-        if transcript_path and Path(transcript_path).exists():
-            return self._parse_transcript(transcript_path)
+        if transcript_path:
+            context = self._parse_transcript(transcript_path)
+            if context is not None:
+                return context
         
         # For now, return a basic context structure
         # In production, this would read actual Claude conversation logs
@@ -171,50 +217,61 @@ class IntelligentPostToolUseHook:
             file_path = tool_input.get('file_path', '')
             content = tool_input.get('content', '')[:200]  # First 200 chars
             
-            # Infer from filename
-            if 'redis' in file_path.lower():
-                context['user_request'] = "Working with Redis configuration or setup"
-            elif 'api' in file_path.lower():
-                context['user_request'] = "Creating or modifying API endpoints"
-            elif 'database' in file_path.lower():
-                context['user_request'] = "Database-related operations"
-            else:
-                context['user_request'] = f"Working on {file_path}"
+            # Infer from filename (one case-insensitive scan; keywords keep INTENT_MESSAGES priority)
+            found = {match.lower() for match in INTENT_RE.findall(file_path)}
+            context['user_request'] = next(
+                (message for keyword, message in INTENT_MESSAGES.items() if keyword in found),
+                f"Working on {file_path}"
+            )
             
             context['file_path'] = file_path
             context['content_preview'] = content
         
         return context
     
-    def _parse_transcript(self, transcript_path: str) -> dict:
-        """Parse Claude conversation transcript for context."""
+    def _parse_transcript(self, transcript_path: str) -> Optional[dict]:
+        """Parse Claude conversation transcript for context; None if it doesn't exist."""
         try:
-            with open(transcript_path, 'r') as f:
-                content = f.read()
+            # Only the tail matters (the latest exchange and the last 1000 chars),
+            # so read a bounded window from the end instead of the whole file
+            with open(transcript_path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - TRANSCRIPT_TAIL_BYTES))
+                tail = f.read().decode('utf-8', 'replace')
             
             # Extract relevant parts of conversation
             # This is a simplified version - real implementation would be more sophisticated
-            lines = content.split('\n')
+            lines = tail.split('\n')
             
-            # Look for user messages and assistant responses
+            # Look backwards for the most recent assistant response that follows a user message
             user_request = ""
             assistant_response = ""
             
-            for i, line in enumerate(lines):
-                if line.startswith("Human:") or line.startswith("User:"):
-                    # Get the user's request
-                    user_request = line + " " + lines[i+1] if i+1 < len(lines) else line
-                elif line.startswith("Assistant:") and user_request:
-                    # Get the assistant's response
-                    assistant_response = line + " " + lines[i+1] if i+1 < len(lines) else line
+            def turn(idx):
+                # A turn is its marker line joined with the line after it
+                return ' '.join(lines[idx:idx + 2])
+            
+            last = len(lines) - 1
+            
+            assistant_idx = None
+            for i in range(last, -1, -1):
+                line = lines[i]
+                if line.startswith("Assistant:"):
+                    assistant_idx = i
+                elif assistant_idx is not None and line.startswith(("Human:", "User:")):
+                    # Get the user's request and the assistant's response
+                    user_request = turn(i)
+                    assistant_response = turn(assistant_idx)
                     break
             
             return {
                 "user_request": user_request,
                 "assistant_response": assistant_response,
-                "conversation_snippet": content[-1000:]  # Last 1000 chars
+                "conversation_snippet": tail[-1000:]  # Last 1000 chars
             }
             
+        except FileNotFoundError:
+            return None  # Fall back to context inferred from the tool input
         except Exception:
             return {}
     
@@ -237,14 +294,21 @@ class IntelligentPostToolUseHook:
 def main():
     """Main entry point for the intelligent PostToolUse hook."""
     try:
-        input_data = json.load(sys.stdin)
+        payload = sys.stdin.buffer.read()
+        # The daemon acknowledges immediately and analyzes after we've exited;
+        # if none is running yet, one is spawned and this event is handled here
+        if USE_DAEMON:
+            from context7_cache_hook import DAEMON_POSTTOOLUSE_HOOK, forward_to_daemon
+            if forward_to_daemon(DAEMON_POSTTOOLUSE_HOOK, payload) is not None:
+                sys.exit(0)
+        input_data = orjson.loads(payload) if orjson else json.loads(payload)
+        if input_data.get('tool_name', '') not in RELEVANT_TOOLS:
+            sys.exit(0)  # Skip database and analyzer setup entirely
         hook = IntelligentPostToolUseHook()
         hook.process(input_data)
     except Exception as e:
         # Log error and exit gracefully
-        error_log = Path.home() / '.claude' / 'hook_errors.log'
-        with open(error_log, 'a') as f:
-            f.write(f"[{datetime.now().isoformat()}] Hook error: {e}\n")
+        _log_error(f"Hook error: {e}")
         sys.exit(0)
 
 if __name__ == "__main__":
@@ -9,24 +9,38 @@ Utility functions for manual cache management
 
 import sys
 import json
-import argparse
 from pathlib import Path
+from typing import Iterator, List, TextIO, Union
 
 # Add project to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.db.database_manager import DatabaseManager
-from src.extractors.basic_extractor import BasicSectionExtractor
-from src.detectors.operation_detector import OperationDetector
 
-def cache_document(cache_key: str, framework: str, content: str):
-    """Manually cache a document"""
+def _tee_lines(stream: TextIO, parts: List[str]) -> Iterator[str]:
+    """Yields lines from stream while collecting them into parts."""
+    line = ''
+    for line in stream:
+        parts.append(line)
+        yield line
+    if line.endswith('\n') or not parts:
+        yield ''  # Same trailing piece str.split('\n') produces
+
+def cache_document(cache_key: str, framework: str, content: Union[str, TextIO]):
+    """Manually cache a document, given as a string or a stream such as stdin"""
+    from src.extractors.basic_extractor import BasicSectionExtractor
+    
     try:
         db = DatabaseManager()
         extractor = BasicSectionExtractor()
         
-        # Extract sections from content
-        sections = extractor.extract_sections(content)
+        # Extract sections from content; streams are parsed while being read
+        if isinstance(content, str):
+            sections = extractor.extract_sections(content)
+        else:
+            parts = []
+            sections = dict(extractor.extract_sections_stream(_tee_lines(content, parts)))
+            content = ''.join(parts)
         
         if not sections:
             print(f"❌ Could not extract sections from content")
@@ -43,31 +57,35 @@ def cache_document(cache_key: str, framework: str, content: str):
         print(f"❌ Error caching document: {str(e)}")
         return False
 
-def list_cache():
-    """List all cached documents"""
+def list_cache(limit: int = None):
+    """List cached documents, most recently accessed first"""
     try:
         db = DatabaseManager()
         
         with db.get_connection() as conn:
+            # expires_at is stored in local time, so compare against localtime
             rows = conn.execute('''
-                SELECT cache_key, framework, component, access_count, 
-                       last_accessed, expires_at
+                SELECT cache_key, framework, component, access_count, last_accessed,
+                       CASE WHEN expires_at > datetime('now', 'localtime')
+                            THEN '🟢' ELSE '🔴' END AS status
                 FROM context_cache 
                 ORDER BY last_accessed DESC
-            ''').fetchall()
-        
-        if not rows:
+                LIMIT ?
+            ''', (limit if limit is not None else -1,))
+            
+            found = False
+            for row in rows:
+                if not found:
+                    print("📚 Cached Documents:")
+                    print("-" * 80)
+                    found = True
+                component = f" ({row['component']})" if row['component'] else ""
+                print(f"{row['status']} {row['cache_key']} - {row['framework']}{component}")
+                print(f"   Accessed: {row['access_count']} times, Last: {row['last_accessed']}")
+                print()
+        
+        if not found:
             print("📭 No cached documents found")
-            return
-        
-        print("📚 Cached Documents:")
-        print("-" * 80)
-        for row in rows:
-            status = "🟢" if row['expires_at'] > str(datetime.now()) else "🔴"
-            component = f" ({row['component']})" if row['component'] else ""
-            print(f"{status} {row['cache_key']} - {row['framework']}{component}")
-            print(f"   Accessed: {row['access_count']} times, Last: {row['last_accessed']}")
-            print()
             
     except Exception as e:
         print(f"❌ Error listing cache: {str(e)}")
@@ -102,7 +120,7 @@ def clear_cache(framework: str = None):
     try:
         db = DatabaseManager()
         
-        with db.get_connection() as conn:
+        with db.write_txn() as conn:
             if framework:
                 conn.execute('DELETE FROM context_cache WHERE framework = ?', (framework,))
                 print(f"🗑️ Cleared {framework} cache entries")
@@ -113,7 +131,18 @@ def clear_cache(framework: str = None):
     except Exception as e:
         print(f"❌ Error clearing cache: {str(e)}")
 
+# Argument-free commands that can skip building the argparse parser
+_FAST = {
+    'list': list_cache,
+    'stats': show_stats,
+}
+
 def main():
+    if len(sys.argv) == 2 and sys.argv[1] in _FAST:
+        _FAST[sys.argv[1]]()
+        return
+    
+    import argparse
     parser = argparse.ArgumentParser(description='Context7 Cache Utilities')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
@@ -124,7 +153,8 @@ def main():
     cache_parser.add_argument('--content', help='Content to cache (or read from stdin)')
     
     # List command
-    subparsers.add_parser('list', help='List cached documents')
+    list_parser = subparsers.add_parser('list', help='List cached documents')
+    list_parser.add_argument('--limit', type=int, help='Maximum number of entries to show')
     
     # Stats command
     subparsers.add_parser('stats', help='Show cache statistics')
@@ -140,12 +170,12 @@ def main():
             content = args.content
         else:
             print("📋 Reading content from stdin... (Ctrl+D when done)")
-            content = sys.stdin.read()
+            content = sys.stdin
         
         cache_document(args.cache_key, args.framework, content)
         
     elif args.command == 'list':
-        list_cache()
+        list_cache(args.limit)
         
     elif args.command == 'stats':
         show_stats()
@@ -157,5 +187,4 @@ def main():
         parser.print_help()
 
 if __name__ == '__main__':
-    from datetime import datetime
     main()
\ No newline at end of file
@@ -70,4 +70,11 @@ FROM session_logs s
 JOIN context_cache c ON s.cache_key = c.cache_key
 WHERE s.analyzed_at IS NULL
     AND s.timestamp < NOW() - INTERVAL '5 minutes'
-ORDER BY s.timestamp ASC;
\ No newline at end of file
+ORDER BY s.timestamp ASC;
+-- Latest synced log timestamps, fetched in one call when a machine has no local sync state
+CREATE OR REPLACE FUNCTION last_log_timestamps()
+RETURNS TABLE (usage_logs TIMESTAMPTZ, session_logs TIMESTAMPTZ)
+LANGUAGE sql STABLE AS $$
+    SELECT (SELECT MAX(timestamp) FROM usage_logs),
+           (SELECT MAX(timestamp) FROM session_logs);
+$$;
@@ -2,6 +2,8 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "httpx[http2]",
+#     "orjson",
 #     "supabase",
 #     "python-dotenv",
 # ]
@@ -15,14 +17,19 @@ import os
 import sys
 import json
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import argparse
 
 # Add project to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.db.database_manager import compute_content_hash
+
 # Load .env file if it exists
 try:
     from dotenv import load_dotenv
@@ -37,284 +44,444 @@ except ImportError:
     print("❌ Supabase client not installed. Run: pip install supabase")
     sys.exit(1)
 
+try:
+    import httpx
+    from supabase import ClientOptions
+except ImportError:
+    # Older supabase client, use its default transport
+    httpx = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    json_loads = json.loads
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import PatternMatchingEventHandler
+except ImportError:
+    # watchdog not installed, --watch falls back to polling
+    Observer = None
+
+# Rows sent per Supabase request, and how many requests may be in flight at once
+SYNC_BATCH_SIZE = 500
+SYNC_WORKERS = 8
+
+# Columns synced for each table, in SELECT order; rows are read as plain tuples
+CACHE_COLUMNS = ('cache_key', 'framework', 'component', 'full_content', 'sections', 'created_at',
+                 'last_accessed', 'access_count', 'total_tokens', 'expires_at')
+USAGE_LOG_COLUMNS = ('log_id', 'session_id', 'cache_key', 'operation_type', 'sections_provided',
+                     'tokens_used', 'tool_name', 'file_path', 'timestamp', 'was_successful', 'user_feedback')
+RULE_COLUMNS = ('rule_id', 'framework', 'operation_type', 'sections', 'max_tokens', 'confidence_score',
+                'is_default', 'usage_count', 'success_count')
+SESSION_LOG_COLUMNS = ('log_id', 'session_id', 'cache_key', 'operation_type', 'sections_provided',
+                       'tokens_used', 'tool_name', 'tool_input', 'file_path', 'timestamp', 'session_complete',
+                       'follow_up_actions', 'effectiveness_score', 'effectiveness_reason', 'confidence_score',
+                       'analyzed_at')
+
+# Matches the supabase client's default PostgREST timeout
+HTTP_TIMEOUT = 120
+
+# How long --watch lets a burst of database writes settle before syncing
+WATCH_DEBOUNCE = 2.0
+
 class SupabaseSync:
     """Sync SQLite database to Supabase"""
     
     def __init__(self, supabase_url: str, supabase_key: str):
         """Initialize with Supabase credentials"""
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self._http_client = self._create_http_client()
+        options = None
+        if self._http_client is not None:
+            try:
+                options = ClientOptions(httpx_client=self._http_client)
+            except TypeError:
+                # This supabase version can't take an HTTP client, so it makes its own
+                self._http_client.close()
+                self._http_client = None
+        self.supabase: Client = create_client(supabase_url, supabase_key, options=options)
         self.sqlite_path = Path.home() / '.claude' / 'context7_cache.db'
         
         if not self.sqlite_path.exists():
             raise FileNotFoundError(f"SQLite database not found at {self.sqlite_path}")
+        
+        # Log table high-water marks and synced cache entry fingerprints
+        self.sync_state_path = self.sqlite_path.parent / 'supabase_sync_state.json'
+        self._state_lock = threading.Lock()
+        
+        # One SQLite connection per syncing thread, reused across sync_* calls
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+    
+    @staticmethod
+    def _create_http_client() -> Optional["httpx.Client"]:
+        """One keep-alive HTTP client for every Supabase request, so batches share connections"""
+        if httpx is None:
+            return None
+        limits = httpx.Limits(max_connections=SYNC_WORKERS * 2,
+                              max_keepalive_connections=SYNC_WORKERS * 2)
+        try:
+            # Concurrent batches multiplex over a single HTTP/2 connection
+            return httpx.Client(http2=True, limits=limits, timeout=HTTP_TIMEOUT)
+        except ImportError:
+            # h2 not installed, keep-alive still saves the per-request handshakes
+            return httpx.Client(limits=limits, timeout=HTTP_TIMEOUT)
     
     def get_sqlite_connection(self):
-        """Get SQLite connection with row factory"""
-        conn = sqlite3.connect(self.sqlite_path)
-        conn.row_factory = sqlite3.Row
+        """Get SQLite connection returning plain tuples, tuned for full-table reads"""
+        # Each connection is only used by the thread that opened it, but close()
+        # may run on another one
+        conn = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+        # The hooks keep the database in WAL mode, so this reader sees a snapshot
+        # without blocking their writes; the rest favours long sequential scans
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
         return conn
     
-    def sync_context_cache(self, full_sync: bool = False) -> Dict[str, int]:
-        """Sync context_cache table"""
-        conn = self.get_sqlite_connection()
-        stats = {'inserted': 0, 'updated': 0, 'errors': 0}
+    def database_state(self) -> Optional[Tuple[int, ...]]:
+        """Cheap change marker: size and mtime of the database and its WAL, or None if unknown"""
+        try:
+            db_stat = self.sqlite_path.stat()
+        except FileNotFoundError:
+            return None
+        try:
+            wal_stat = self.sqlite_path.with_name(self.sqlite_path.name + '-wal').stat()
+            wal_state = (wal_stat.st_size, wal_stat.st_mtime_ns)
+        except FileNotFoundError:
+            # The WAL is removed when the last connection closes; its pages are in the db by then
+            wal_state = (0, 0)
+        return (db_stat.st_size, db_stat.st_mtime_ns) + wal_state
+    
+    def _get_connection(self):
+        """Get this thread's SQLite connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.get_sqlite_connection()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Close the SQLite connections opened by the sync methods, and the HTTP client"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        if self._http_client is not None:
+            self._http_client.close()
+    
+    def _upsert_batch(self, table: str, batch: List[Dict[str, Any]], on_conflict: str,
+                      id_field: str, label: str, ignore_duplicates: bool = False) -> Tuple[int, int]:
+        """Upsert a batch in one request, retrying row by row to isolate a bad record.
+        
+        With ignore_duplicates, existing rows are skipped server-side (ON CONFLICT DO
+        NOTHING) and only the rows actually inserted are counted. Returns (synced, errors).
+        """
+        # Only the inserted rows are needed back, and only to count them; otherwise
+        # ask PostgREST not to echo the batch
+        returning = 'representation' if ignore_duplicates else 'minimal'
+        
+        def upsert(rows):
+            response = self.supabase.table(table).upsert(
+                rows,
+                on_conflict=on_conflict,
+                ignore_duplicates=ignore_duplicates,
+                returning=returning
+            ).execute()
+            return len(response.data) if ignore_duplicates else len(rows)
         
         try:
-            # Get all records from SQLite
-            cursor = conn.execute("SELECT * FROM context_cache")
-            records = cursor.fetchall()
-            
-            for record in records:
+            return upsert(batch), 0
+        except Exception:
+            synced = errors = 0
+            for data in batch:
                 try:
-                    # Convert record to dict
-                    data = {
-                        'cache_key': record['cache_key'],
-                        'framework': record['framework'],
-                        'component': record['component'],
-                        'full_content': record['full_content'],
-                        'sections': json.loads(record['sections']),
-                        'created_at': record['created_at'],
-                        'last_accessed': record['last_accessed'],
-                        'access_count': record['access_count'],
-                        'total_tokens': record['total_tokens'],
-                        'expires_at': record['expires_at']
-                    }
-                    
-                    # Try to upsert (insert or update)
-                    response = self.supabase.table('context_cache').upsert(
-                        data, 
-                        on_conflict='cache_key'
-                    ).execute()
-                    
-                    stats['updated'] += 1
-                    
+                    synced += upsert([data])
                 except Exception as e:
-                    print(f"❌ Error syncing cache key {record['cache_key']}: {e}")
-                    stats['errors'] += 1
+                    print(f"❌ Error syncing {label} {data[id_field]}: {e}")
+                    errors += 1
+            return synced, errors
+    
+    @staticmethod
+    def _decode_json_column(values: List[Optional[str]]) -> List[Any]:
+        """Decode a column of JSON documents with a single parser call; empty values decode to None"""
+        decoded = json_loads('[' + ','.join([value or 'null' for value in values]) + ']')
+        if len(decoded) != len(values):
+            raise ValueError("column does not hold one JSON document per row")
+        return decoded
+    
+    def _convert_batch(self, rows: List[tuple], columns: Tuple[str, ...], json_columns: Tuple[str, ...],
+                       id_field: str, label: str, stats: Dict[str, int],
+                       convert: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Turn a batch of SQLite rows, selected in columns order, into upsert records.
+        
+        json_columns are decoded in place; convert may then adjust each record.
+        """
+        json_indexes = [columns.index(name) for name in json_columns]
+        id_index = columns.index(id_field)
+        try:
+            decoded_columns = [self._decode_json_column([row[index] for row in rows])
+                               for index in json_indexes]
+        except (ValueError, TypeError):
+            # A row holds malformed JSON; decode row by row so only that row is dropped
+            decoded_columns = None
+        
+        batch = []
+        for i, row in enumerate(rows):
+            try:
+                if decoded_columns is not None:
+                    decoded = [column[i] for column in decoded_columns]
+                else:
+                    decoded = [json_loads(row[index]) if row[index] else None for index in json_indexes]
+                # zip stops at the shorter side, so extra trailing SELECT columns are left out
+                data = dict(zip(columns, row))
+                data.update(zip(json_columns, decoded))
+                if convert:
+                    convert(data)
+                batch.append(data)
+            except Exception as e:
+                print(f"❌ Error syncing {label} {row[id_index]}: {e}")
+                stats['errors'] += 1
+        return batch
+    
+    def _sync_rows(self, rows: Iterable[tuple], columns: Tuple[str, ...], json_columns: Tuple[str, ...],
+                   table: str, on_conflict: str, id_field: str, label: str, stats: Dict[str, int],
+                   counter: str, ignore_duplicates: bool = False,
+                   convert: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   on_batch_synced: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """Convert SQLite rows and upsert them in batches, with requests running concurrently.
+        
+        on_batch_synced is called, on this thread, with each batch that synced without errors.
+        """
+        futures = {}
+        records = []
+        
+        def record(done):
+            for future in done:
+                synced, errors = future.result()
+                stats[counter] += synced
+                stats['errors'] += errors
+                # Popped as it is reported, so the converted batch can be freed
+                batch = futures.pop(future)
+                if on_batch_synced and not errors:
+                    on_batch_synced(batch)
+        
+        def submit():
+            batch = self._convert_batch(records, columns, json_columns, id_field, label, stats, convert)
+            if batch:
+                # Cap the batches in flight, or the whole cursor is converted before any upsert returns
+                if len(futures) >= 2 * SYNC_WORKERS:
+                    record(wait(futures, return_when=FIRST_COMPLETED).done)
+                future = pool.submit(self._upsert_batch, table, batch, on_conflict,
+                                     id_field, label, ignore_duplicates)
+                futures[future] = batch
+        
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+            # Iterate the cursor so rows stream in rather than being loaded all at once
+            for row in rows:
+                records.append(row)
+                if len(records) >= SYNC_BATCH_SIZE:
+                    submit()
+                    records = []
             
-        finally:
-            conn.close()
+            if records:
+                submit()
+            
+            record(as_completed(list(futures)))
+    
+    @staticmethod
+    def _cache_fingerprint(row: tuple) -> str:
+        """Identify the synced state of a cache entry without comparing its content"""
+        (_, _, _, full_content, sections, _, last_accessed, access_count,
+         total_tokens, expires_at, content_hash) = row
+        content_hash = content_hash or compute_content_hash(full_content, sections)
+        return f"{content_hash.hex()}:{total_tokens}:{access_count}:{last_accessed}:{expires_at}"
+    
+    def sync_context_cache(self, full_sync: bool = False) -> Dict[str, int]:
+        """Sync context_cache table"""
+        conn = self._get_connection()
+        stats = {'inserted': 0, 'updated': 0, 'errors': 0}
+        
+        # Entries whose fingerprint matches the last successful sync are skipped,
+        # unless this is a full sync
+        synced_fingerprints = {} if full_sync else self._load_sync_state().get('context_cache_rows', {})
+        fingerprints = {}  # Every current entry -> fingerprint, to save once synced
+        current = {}       # Fingerprints known to be in Supabase after this pass
+        
+        def changed_rows(cursor):
+            for row in cursor:
+                cache_key = row[0]
+                fingerprint = self._cache_fingerprint(row)
+                if synced_fingerprints.get(cache_key) == fingerprint:
+                    current[cache_key] = fingerprint
+                else:
+                    fingerprints[cache_key] = fingerprint
+                    yield row
+        
+        def record_synced(batch):
+            for data in batch:
+                current[data['cache_key']] = fingerprints[data['cache_key']]
+        
+        # Get all records from SQLite and upsert (insert or update) the changed ones.
+        # content_hash is only read for the fingerprint, so it comes last and isn't sent
+        cursor = conn.execute(f"SELECT {', '.join(CACHE_COLUMNS)}, content_hash FROM context_cache")
+        self._sync_rows(changed_rows(cursor), CACHE_COLUMNS, ('sections',), 'context_cache', 'cache_key',
+                        'cache_key', 'cache key', stats, 'updated', on_batch_synced=record_synced)
+        
+        # Rebuilt from this pass, so entries deleted locally drop out
+        self._save_sync_state('context_cache_rows', current)
         
         return stats
     
+    def _scan_logs(self, conn: sqlite3.Connection, table: str, columns: Tuple[str, ...],
+                   since_timestamp: Optional[str], high_ts: Optional[str]) -> Iterator[tuple]:
+        """Yield a log table's rows from since_timestamp (inclusive) to high_ts, in (timestamp, log_id) order.
+        
+        Rows are read a batch at a time by keyset pagination on the (timestamp, log_id) index,
+        so the scan never sorts or holds the whole table.
+        """
+        if high_ts is None:
+            return
+        
+        query = f"""
+            SELECT {', '.join(columns)} FROM {table}
+            WHERE (timestamp, log_id) > (?, ?) AND timestamp <= ?
+            ORDER BY timestamp, log_id
+            LIMIT ?
+        """
+        timestamp_index, log_id_index = columns.index('timestamp'), columns.index('log_id')
+        
+        # log_ids start at 1, so the seed keeps rows at exactly since_timestamp
+        last = (since_timestamp or '', 0)
+        while True:
+            page = conn.execute(query, (*last, high_ts, SYNC_BATCH_SIZE)).fetchall()
+            yield from page
+            if len(page) < SYNC_BATCH_SIZE:
+                return
+            last = (page[-1][timestamp_index], page[-1][log_id_index])
+    
     def sync_usage_logs(self, since_timestamp: Optional[str] = None) -> Dict[str, int]:
         """Sync usage_logs table"""
-        conn = self.get_sqlite_connection()
+        conn = self._get_connection()
         stats = {'inserted': 0, 'errors': 0}
         
-        try:
-            # Build query
-            query = "SELECT * FROM usage_logs"
-            params = []
-            
-            if since_timestamp:
-                query += " WHERE timestamp > ?"
-                params.append(since_timestamp)
-            
-            query += " ORDER BY timestamp ASC"
-            
-            cursor = conn.execute(query, params)
-            records = cursor.fetchall()
-            
-            for record in records:
-                try:
-                    # Convert record to dict
-                    data = {
-                        'log_id': record['log_id'],
-                        'session_id': record['session_id'],
-                        'cache_key': record['cache_key'],
-                        'operation_type': record['operation_type'],
-                        'sections_provided': json.loads(record['sections_provided']),
-                        'tokens_used': record['tokens_used'],
-                        'tool_name': record['tool_name'],
-                        'file_path': record['file_path'],
-                        'timestamp': record['timestamp'],
-                        'was_successful': record['was_successful'],
-                        'user_feedback': record['user_feedback']
-                    }
-                    
-                    # Insert (don't update existing logs)
-                    response = self.supabase.table('usage_logs').insert(data).execute()
-                    stats['inserted'] += 1
-                    
-                except Exception as e:
-                    # Check if it's a duplicate key error
-                    if 'duplicate key' in str(e).lower():
-                        # Skip duplicates silently
-                        pass
-                    else:
-                        print(f"❌ Error syncing log {record['log_id']}: {e}")
-                        stats['errors'] += 1
-            
-        finally:
-            conn.close()
+        # Bound the scan so the saved high-water mark covers exactly the rows sent
+        high_ts = conn.execute("SELECT MAX(timestamp) FROM usage_logs").fetchone()[0]
+        
+        # Insert, skipping logs that were already synced (don't update existing logs).
+        # The scan is inclusive of since_timestamp so logs written later in the same second aren't missed
+        rows = self._scan_logs(conn, 'usage_logs', USAGE_LOG_COLUMNS, since_timestamp, high_ts)
+        self._sync_rows(rows, USAGE_LOG_COLUMNS, ('sections_provided',), 'usage_logs', 'log_id',
+                        'log_id', 'log', stats, 'inserted', ignore_duplicates=True)
+        
+        if high_ts and not stats['errors']:
+            self._save_sync_state('usage_logs', high_ts)
         
         return stats
     
     def sync_extraction_rules(self) -> Dict[str, int]:
         """Sync extraction_rules table"""
-        conn = self.get_sqlite_connection()
+        conn = self._get_connection()
         stats = {'synced': 0, 'errors': 0}
         
-        try:
-            cursor = conn.execute("SELECT * FROM extraction_rules")
-            records = cursor.fetchall()
-            
-            for record in records:
-                try:
-                    data = {
-                        'rule_id': record['rule_id'],
-                        'framework': record['framework'],
-                        'operation_type': record['operation_type'],
-                        'sections': json.loads(record['sections']),
-                        'max_tokens': record['max_tokens'],
-                        'confidence_score': record['confidence_score'],
-                        'is_default': bool(record['is_default']),
-                        'usage_count': record['usage_count'],
-                        'success_count': record['success_count']
-                    }
-                    
-                    # Upsert rules
-                    response = self.supabase.table('extraction_rules').upsert(
-                        data,
-                        on_conflict='framework,operation_type'
-                    ).execute()
-                    
-                    stats['synced'] += 1
-                    
-                except Exception as e:
-                    print(f"❌ Error syncing rule {record['rule_id']}: {e}")
-                    stats['errors'] += 1
-            
-        finally:
-            conn.close()
+        def convert(data):
+            data['is_default'] = bool(data['is_default'])
+        
+        # Upsert rules
+        cursor = conn.execute(f"SELECT {', '.join(RULE_COLUMNS)} FROM extraction_rules")
+        self._sync_rows(cursor, RULE_COLUMNS, ('sections',), 'extraction_rules', 'framework,operation_type',
+                        'rule_id', 'rule', stats, 'synced', convert=convert)
         
         return stats
     
     def sync_session_logs(self, since_timestamp: Optional[str] = None) -> Dict[str, int]:
         """Sync session_logs table"""
-        conn = self.get_sqlite_connection()
+        conn = self._get_connection()
         stats = {'inserted': 0, 'errors': 0}
         
-        try:
-            # Build query
-            query = "SELECT * FROM session_logs"
-            params = []
-            
-            if since_timestamp:
-                query += " WHERE timestamp > ?"
-                params.append(since_timestamp)
-            
-            query += " ORDER BY timestamp ASC"
-            
-            cursor = conn.execute(query, params)
-            records = cursor.fetchall()
-            
-            for record in records:
-                try:
-                    # Convert record to dict
-                    data = {
-                        'log_id': record['log_id'],
-                        'session_id': record['session_id'],
-                        'cache_key': record['cache_key'],
-                        'operation_type': record['operation_type'],
-                        'sections_provided': json.loads(record['sections_provided']),
-                        'tokens_used': record['tokens_used'],
-                        'tool_name': record['tool_name'],
-                        'tool_input': json.loads(record['tool_input']),
-                        'file_path': record['file_path'],
-                        'timestamp': record['timestamp'],
-                        'session_complete': record['session_complete'],
-                        'follow_up_actions': json.loads(record['follow_up_actions']) if record['follow_up_actions'] else None,
-                        'effectiveness_score': record['effectiveness_score'],
-                        'effectiveness_reason': record['effectiveness_reason'],
-                        'confidence_score': record['confidence_score'],
-                        'analyzed_at': record['analyzed_at']
-                    }
-                    
-                    # Insert (don't update existing logs)
-                    response = self.supabase.table('session_logs').insert(data).execute()
-                    stats['inserted'] += 1
-                    
-                except Exception as e:
-                    # Check if it's a duplicate key error
-                    if 'duplicate key' in str(e).lower():
-                        # Skip duplicates silently
-                        pass
-                    else:
-                        print(f"❌ Error syncing session log {record['log_id']}: {e}")
-                        stats['errors'] += 1
-            
-        finally:
-            conn.close()
+        # Bound the scan so the saved high-water mark covers exactly the rows sent
+        high_ts = conn.execute("SELECT MAX(timestamp) FROM session_logs").fetchone()[0]
+        
+        # Insert, skipping logs that were already synced (don't update existing logs).
+        # The scan is inclusive of since_timestamp so logs written later in the same second aren't missed
+        rows = self._scan_logs(conn, 'session_logs', SESSION_LOG_COLUMNS, since_timestamp, high_ts)
+        self._sync_rows(rows, SESSION_LOG_COLUMNS, ('sections_provided', 'tool_input', 'follow_up_actions'),
+                        'session_logs', 'log_id', 'log_id', 'session log', stats, 'inserted', ignore_duplicates=True)
+        
+        if high_ts and not stats['errors']:
+            self._save_sync_state('session_logs', high_ts)
         
         return stats
     
-    def get_last_sync_timestamp(self) -> Optional[str]:
-        """Get the timestamp of the last synced log (from either usage_logs or session_logs)"""
-        last_usage_log = None
-        last_session_log = None
-        
+    def _load_sync_state(self) -> Dict[str, Any]:
+        """Read the local sync state file"""
         try:
-            # Get last usage log timestamp
-            response = self.supabase.table('usage_logs')\
-                .select('timestamp')\
-                .order('timestamp', desc=True)\
-                .limit(1)\
-                .execute()
-            
-            if response.data:
-                last_usage_log = response.data[0]['timestamp']
+            return json.loads(self.sync_state_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    def _save_sync_state(self, key: str, value: Any):
+        """Set one entry of the local sync state file"""
+        with self._state_lock:
+            state = self._load_sync_state()
+            state[key] = value
             
-        except Exception:
-            pass
-        
+            # Write atomically so an interrupted sync can't leave a truncated file
+            tmp_path = self.sync_state_path.with_suffix('.json.tmp')
+            tmp_path.write_text(json.dumps(state, indent=2))
+            os.replace(tmp_path, self.sync_state_path)
+    
+    def get_last_sync_timestamp(self, table: str) -> Optional[str]:
+        """Get the timestamp up to which a log table was last synced cleanly"""
+        return self._load_sync_state().get(table)
+    
+    def get_remote_sync_timestamps(self) -> Dict[str, str]:
+        """Get the latest log timestamps already in Supabase, in one request"""
         try:
-            # Get last session log timestamp
-            response = self.supabase.table('session_logs')\
-                .select('timestamp')\
-                .order('timestamp', desc=True)\
-                .limit(1)\
-                .execute()
-            
-            if response.data:
-                last_session_log = response.data[0]['timestamp']
-            
+            response = self.supabase.rpc('last_log_timestamps').execute()
         except Exception:
-            pass
-        
-        # Return the most recent timestamp
-        if last_usage_log and last_session_log:
-            return max(last_usage_log, last_session_log)
-        elif last_usage_log:
-            return last_usage_log
-        elif last_session_log:
-            return last_session_log
+            # Function not installed (see supabase_session_logs_schema.sql)
+            return {}
         
-        return None
+        row = response.data[0] if response.data else {}
+        # Postgres returns ISO 8601 with an offset; SQLite stores 'YYYY-MM-DD HH:MM:SS' in UTC
+        return {table: ts[:19].replace('T', ' ') for table, ts in row.items() if ts}
     
     def full_sync(self):
         """Perform a full sync of all tables"""
         print("🔄 Starting full sync to Supabase...")
         
+        # The tables are independent, so sync them concurrently and report in order
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            cache_future = pool.submit(self.sync_context_cache, full_sync=True)
+            rules_future = pool.submit(self.sync_extraction_rules)
+            logs_future = pool.submit(self.sync_usage_logs)
+            session_future = pool.submit(self.sync_session_logs)
+        
         # Sync context cache
         print("\n📦 Syncing context cache...")
-        cache_stats = self.sync_context_cache(full_sync=True)
+        cache_stats = cache_future.result()
         print(f"  ✓ Updated: {cache_stats['updated']}, Errors: {cache_stats['errors']}")
         
         # Sync extraction rules
         print("\n📋 Syncing extraction rules...")
-        rules_stats = self.sync_extraction_rules()
+        rules_stats = rules_future.result()
         print(f"  ✓ Synced: {rules_stats['synced']}, Errors: {rules_stats['errors']}")
         
         # Sync usage logs
         print("\n📊 Syncing usage logs...")
-        logs_stats = self.sync_usage_logs()
+        logs_stats = logs_future.result()
         print(f"  ✓ Inserted: {logs_stats['inserted']}, Errors: {logs_stats['errors']}")
         
         # Sync session logs
         print("\n📈 Syncing session logs...")
-        session_stats = self.sync_session_logs()
+        session_stats = session_future.result()
         print(f"  ✓ Inserted: {session_stats['inserted']}, Errors: {session_stats['errors']}")
         
         print("\n✅ Full sync completed!")
@@ -323,14 +490,20 @@ class SupabaseSync:
         """Perform incremental sync (new usage logs only)"""
         print("🔄 Starting incremental sync...")
         
-        # Get last sync timestamp
-        last_sync = self.get_last_sync_timestamp()
+        # Get last sync timestamps, falling back to what Supabase already has
+        last_usage_sync = self.get_last_sync_timestamp('usage_logs')
+        last_session_sync = self.get_last_sync_timestamp('session_logs')
+        if not (last_usage_sync and last_session_sync):
+            remote = self.get_remote_sync_timestamps()
+            last_usage_sync = last_usage_sync or remote.get('usage_logs')
+            last_session_sync = last_session_sync or remote.get('session_logs')
         
+        last_sync = max(filter(None, (last_usage_sync, last_session_sync)), default=None)
         if last_sync:
             print(f"  📅 Last sync: {last_sync}")
         
         # Sync new usage logs
-        logs_stats = self.sync_usage_logs(since_timestamp=last_sync)
+        logs_stats = self.sync_usage_logs(since_timestamp=last_usage_sync)
         print(f"  ✓ New logs: {logs_stats['inserted']}, Errors: {logs_stats['errors']}")
         
         # Always sync cache and rules in case they changed
@@ -338,18 +511,51 @@ class SupabaseSync:
         print(f"  ✓ Cache updates: {cache_stats['updated']}")
         
         # Sync new session logs
-        session_stats = self.sync_session_logs(since_timestamp=last_sync)
+        session_stats = self.sync_session_logs(since_timestamp=last_session_sync)
         print(f"  ✓ New session logs: {session_stats['inserted']}, Errors: {session_stats['errors']}")
         
         print("\n✅ Incremental sync completed!")
 
+def watch(sync: SupabaseSync, interval: int):
+    """Sync whenever the database changes, and at least check every interval seconds"""
+    changed = threading.Event()
+    observer = None
+    
+    if Observer is not None:
+        # Wake up on writes to the database or its WAL instead of waiting out the interval
+        db_path = str(sync.sqlite_path)
+        handler = PatternMatchingEventHandler(patterns=[db_path, db_path + '-wal'],
+                                              ignore_directories=True)
+        handler.on_any_event = lambda event: changed.set()
+        observer = Observer()
+        observer.schedule(handler, str(sync.sqlite_path.parent))
+        observer.start()
+    
+    try:
+        last_state = None
+        while True:
+            # Skip the scan and cloud round-trips when the database hasn't been written to
+            state = sync.database_state()
+            if state is None or state != last_state:
+                sync.incremental_sync()
+                last_state = state
+            
+            # Without an observer this is a plain sleep
+            if changed.wait(interval):
+                time.sleep(WATCH_DEBOUNCE)
+                changed.clear()
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
 def main():
     parser = argparse.ArgumentParser(description='Sync Context7 Cache to Supabase')
     parser.add_argument('--url', help='Supabase URL (or set SUPABASE_URL env var)')
     parser.add_argument('--key', help='Supabase anon key (or set SUPABASE_KEY env var)')
     parser.add_argument('--full', action='store_true', help='Perform full sync')
     parser.add_argument('--watch', action='store_true', help='Watch for changes and sync continuously')
-    parser.add_argument('--interval', type=int, default=300, help='Watch interval in seconds (default: 300)')
+    parser.add_argument('--interval', type=int, default=300, help='Watch interval in seconds (default: 300; with watchdog installed, changes sync as they happen)')
     
     args = parser.parse_args()
     
@@ -375,11 +581,7 @@ def main():
         if args.watch:
             print(f"👀 Watching for changes (interval: {args.interval}s)...")
             print("   Press Ctrl+C to stop")
-            
-            import time
-            while True:
-                sync.incremental_sync()
-                time.sleep(args.interval)
+            watch(sync, args.interval)
         
         elif args.full:
             sync.full_sync()
@@ -391,6 +593,8 @@ def main():
     except Exception as e:
         print(f"\n❌ Sync failed: {e}")
         sys.exit(1)
+    finally:
+        sync.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
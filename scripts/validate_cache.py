@@ -16,10 +16,19 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.db.database_manager import DatabaseManager
 
+_db = None
+
+def _get_db() -> DatabaseManager:
+    """Returns the process-wide DatabaseManager, creating it on first use"""
+    global _db
+    if _db is None:
+        _db = DatabaseManager()
+    return _db
+
 def validate_cache(cache_key: str) -> bool:
     """Validates that a cache entry exists and has content"""
     try:
-        db = DatabaseManager()
+        db = _get_db()
         cached_data = db.get_cache_data(cache_key)
         
         if not cached_data:
@@ -50,9 +59,10 @@ def validate_cache(cache_key: str) -> bool:
 
 if __name__ == '__main__':
     import argparse
-    parser = argparse.ArgumentParser(description='Validate cache entry')
-    parser.add_argument('cache_key', help='Cache key to validate')
+    parser = argparse.ArgumentParser(description='Validate cache entries')
+    parser.add_argument('cache_keys', nargs='+', metavar='cache_key', help='Cache key(s) to validate')
     args = parser.parse_args()
     
-    success = validate_cache(args.cache_key)
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    # Validate every key, even after a failure, and fail if any did
+    results = [validate_cache(cache_key) for cache_key in args.cache_keys]
+    sys.exit(0 if all(results) else 1)
\ No newline at end of file
@@ -3,15 +3,33 @@
 # requires-python = ">=3.11"
 # dependencies = []
 # ///
+import fcntl
 import json
+import os
 import sys
 import re
+import time
 from pathlib import Path
 
 # Add project src to the Python path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from db.database_manager import DatabaseManager
+from db.database_manager import DatabaseManager, parse_pending_outcomes
+
+# Tools whose outcomes are tracked: Write/Edit operations and Context7 operations
+_RELEVANT_TOOLS = frozenset({
+    'Write', 'Edit', 'MultiEdit', 'Bash',
+    'mcp__Context7__get-library-docs',
+    'mcp__Context7__cache-context'
+})
+_MCP_WRITE_RE = re.compile(r'mcp__.*__(write|edit|multi_edit)')
+# The cache hook writes "Session: {8-char-id}" into its output
+_SESSION_RE = re.compile(r'Session:\s*([a-f0-9-]{8})')
+
+# Outcomes are queued next to the database (DatabaseManager.pending_outcomes_path)
+# and written in batches
+FLUSH_COUNT = 32    # Flush once this many outcomes are queued...
+FLUSH_AGE = 5.0     # ...or once the oldest has waited this many seconds
 
 class SessionOutcomeTracker:
     """Tracks session outcomes to determine effectiveness of cached documentation."""
@@ -51,15 +69,7 @@ class SessionOutcomeTracker:
         if not tool_name:
             return False
         
-        # Track Write/Edit operations and Context7 operations
-        relevant_tools = [
-            'Write', 'Edit', 'MultiEdit', 'Bash',
-            'mcp__Context7__get-library-docs',
-            'mcp__Context7__cache-context'
-        ]
-        
-        return (tool_name in relevant_tools or 
-                re.match(r'mcp__.*__(write|edit|multi_edit)', tool_name or ""))
+        return tool_name in _RELEVANT_TOOLS or _MCP_WRITE_RE.match(tool_name)
     
     def _extract_session_id(self, input_data: dict) -> str:
         """Extract session ID from the tool input or context."""
@@ -76,11 +86,17 @@ class SessionOutcomeTracker:
         content = tool_input.get('content', '')
         reason = tool_input.get('reason', '')
         
-        # Look for session ID pattern in content or reason
-        # The pattern is "Session: {8-char-id}" in the hook output
-        for text in [content, reason, str(tool_input)]:
-            if text:
-                match = re.search(r'Session:\s*([a-f0-9-]{8})', str(text))
+        # Look for session ID pattern in content, reason, then the rest of the input
+        # (without re-stringifying content, which can be a whole file)
+        rest = {key: value for key, value in tool_input.items() if key not in ('content', 'reason')}
+        for text in (content, reason, rest):
+            if not text:
+                continue
+            if not isinstance(text, str):
+                text = str(text)
+            # A plain substring check rejects the common no-marker case before the regex runs
+            if 'Session:' in text:
+                match = _SESSION_RE.search(text)
                 if match:
                     return match.group(1)
         
@@ -91,21 +107,25 @@ class SessionOutcomeTracker:
         output = tool_response.get('output', '') or ''
         error = tool_response.get('error', '') or ''
         
+        # Stringify and lowercase the (possibly large) output once for all the checks below
+        output_text = output if isinstance(output, str) else str(output)
+        output_lower = output_text.lower()
+        
         follow_up_actions = []
         
         # Check if this is actually a successful operation (even if blocked by hook)
         # The hook blocks but provides context, which is a success from tracking perspective
-        if 'filePath' in str(output) or 'success' in str(output).lower():
+        if 'filePath' in output_text or 'success' in output_lower:
             success = True
             follow_up_actions.append("operation_completed_with_context")
         
         # Determine success based on tool type and response
         elif tool_name in ['Write', 'Edit', 'MultiEdit'] or 'write' in tool_name.lower():
-            success = not error and 'error' not in str(output).lower()
+            success = not error and 'error' not in output_lower
             if error:
                 follow_up_actions.append(f"write_error: {error[:100]}")
             # Check if the file was actually written/edited
-            if 'has been' in str(output) and ('updated' in str(output) or 'created' in str(output)):
+            if 'has been' in output_text and ('updated' in output_text or 'created' in output_text):
                 success = True
                 follow_up_actions.append("file_operation_successful")
         
@@ -115,10 +135,10 @@ class SessionOutcomeTracker:
                 follow_up_actions.append(f"bash_error: {error[:100]}")
             
             # Check for specific patterns in bash output
-            if 'context7' in str(output).lower():
+            if 'context7' in output_lower:
                 follow_up_actions.append("immediate_context7_retry")
                 # Don't mark as failure if it's just running context7 commands
-                if 'cache' in str(output).lower() and 'successfully' in str(output).lower():
+                if 'cache' in output_lower and 'successfully' in output_lower:
                     success = True
         
         elif 'Context7' in tool_name:
@@ -137,7 +157,7 @@ class SessionOutcomeTracker:
         return success, follow_up_actions
     
     def _update_recent_session(self, session_id: str, success: bool, follow_up_actions: list):
-        """Update the most recent session log for this session ID."""
+        """Queue an outcome for the most recent session log with this session ID."""
         try:
             with self.db.get_connection() as conn:
                 # Find the most recent session log for this session ID
@@ -147,13 +167,39 @@ class SessionOutcomeTracker:
                     ORDER BY timestamp DESC 
                     LIMIT 1
                 ''', (session_id,)).fetchone()
-                
-                if row:
-                    log_id = row['log_id']
-                    self.db.update_session_outcome(log_id, success, follow_up_actions)
+            
+            if row:
+                self._queue_outcome(row['log_id'], success, follow_up_actions)
         except Exception:
             # Fail silently
             pass
+    
+    def _queue_outcome(self, log_id: int, success: bool, follow_up_actions: list):
+        """Append an outcome to the pending queue, flushing the queue when it is due."""
+        entry = json.dumps({'log_id': log_id, 'success': success,
+                            'actions': follow_up_actions, 'ts': time.time()})
+        
+        with open(self.db.pending_outcomes_path, 'ab+') as f:
+            # Held until the file is closed, so concurrent hooks don't interleave lines
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # A writer that died mid-line leaves no newline; terminate its fragment so
+            # it doesn't swallow this entry when parsed
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    entry = '\n' + entry
+            f.write((entry + '\n').encode())
+            f.flush()
+            f.seek(0)
+            pending = parse_pending_outcomes(f.read().decode())
+            
+            if pending and len(pending) < FLUSH_COUNT and time.time() - pending[0]['ts'] < FLUSH_AGE:
+                return
+        
+        # Whatever is still queued is left for the next flush if this one fails; the
+        # session analyzer also flushes before scoring, so nothing waits indefinitely
+        self.db.flush_pending_outcomes()
 
 def main():
     """Main entry point for the session tracker hook."""
@@ -1,8 +1,115 @@
 # ~/projects/cc-rag/src/analytics/dashboard_generator.py
 import json
-from typing import Dict, List
-from datetime import datetime, timedelta
+import time
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
 from pathlib import Path
+from string import Template
+
+try:
+    import orjson
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    orjson = None
+
+# How long a report is reused while the database is unchanged; bounds how stale the
+# moving time window and the non-database inputs can get
+REPORT_CACHE_TTL = 60.0
+
+_STATUS_INDICATOR = {
+    "excellent": "🟢",
+    "good": "🟡",
+    "fair": "🟠",
+    "needs_improvement": "🔴"
+}
+
+_HTML_TEMPLATE = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Context7 Analytics Dashboard</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
+        .container { max-width: 1200px; margin: 0 auto; }
+        .card { background: white; padding: 20px; margin: 10px 0; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .metric { display: inline-block; margin: 10px 20px 10px 0; }
+        .metric-value { font-size: 24px; font-weight: bold; color: #333; }
+        .metric-label { font-size: 12px; color: #666; text-transform: uppercase; }
+        .status-excellent { color: #4CAF50; }
+        .status-good { color: #FFC107; }
+        .status-fair { color: #FF9800; }
+        .status-needs_improvement { color: #F44336; }
+        .recommendation { margin: 10px 0; padding: 10px; border-left: 4px solid #2196F3; background: #f8f9fa; }
+        .recommendation.high { border-color: #F44336; }
+        .recommendation.medium { border-color: #FF9800; }
+        .recommendation.low { border-color: #4CAF50; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Context7 Analytics Dashboard</h1>
+        <p>Generated: $timestamp</p>
+        
+        <div class="card">
+            <h2>Executive Summary</h2>
+            <div class="status-$status">
+                <span class="metric-value">$status_indicator $system_status</span>
+                <span class="metric-label">System Status</span>
+            </div>
+            <div class="grid">
+                <div class="metric">
+                    <div class="metric-value">$effectiveness</div>
+                    <div class="metric-label">Overall Effectiveness</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-value">$total_sessions</div>
+                    <div class="metric-label">Sessions Analyzed</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-value">$cached_items</div>
+                    <div class="metric-label">Cached Items</div>
+                </div>
+                <div class="metric">
+                    <div class="metric-value">$patterns</div>
+                    <div class="metric-label">Discovered Patterns</div>
+                </div>
+            </div>
+        </div>
+        
+        <div class="grid">
+            <div class="card">
+                <h3>Top Performing Sections</h3>
+                $top_sections
+            </div>
+            
+            <div class="card">
+                <h3>Framework Usage</h3>
+                $framework_usage
+            </div>
+        </div>
+        
+        <div class="card">
+            <h2>Recommendations</h2>
+            $recommendations
+        </div>
+        
+        <div class="card">
+            <h2>System Health</h2>
+            <p><strong>Overall Health:</strong> $health_status</p>
+            <p><strong>Database:</strong> $db_status</p>
+            <p><strong>Cache:</strong> $cache_status</p>
+            <p><strong>Rules:</strong> $rules_status</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+def _fetch_dicts(cursor) -> List[Dict]:
+    """Fetch a cursor's rows as dicts, reading the column names once rather than per row."""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 class AnalyticsDashboard:
     """Generates analytics dashboards and reports for Context7 system."""
@@ -12,9 +119,41 @@ class AnalyticsDashboard:
         self.llm_analyzer = llm_analyzer
         self.pattern_analyzer = pattern_analyzer
         self.healing_manager = healing_manager
+        self._report_cache = None  # (key, monotonic time generated, report)
+    
+    def _database_signature(self) -> Optional[Tuple[int, ...]]:
+        """Size and mtime of the database and its WAL, which change on any write; None if unknown."""
+        db_path = Path(self.db.db_path)
+        if str(db_path) == ':memory:':
+            return None
+        try:
+            db_stat = db_path.stat()
+        except FileNotFoundError:
+            return None
+        try:
+            wal_stat = db_path.with_name(db_path.name + '-wal').stat()
+            wal_state = (wal_stat.st_size, wal_stat.st_mtime_ns)
+        except FileNotFoundError:
+            wal_state = (0, 0)
+        return (db_stat.st_size, db_stat.st_mtime_ns) + wal_state
     
     def generate_comprehensive_report(self, days: int = 7) -> Dict:
-        """Generate a comprehensive analytics report."""
+        """Generate a comprehensive analytics report, reusing a recent one if the database is unchanged."""
+        
+        signature = self._database_signature()
+        now = time.monotonic()
+        if signature is not None and self._report_cache:
+            key, generated, report = self._report_cache
+            if key == (days, signature) and now - generated < REPORT_CACHE_TTL:
+                return report
+        
+        report = self._build_report(days)
+        if signature is not None:
+            self._report_cache = ((days, signature), now, report)
+        return report
+    
+    def _build_report(self, days: int) -> Dict:
+        """Gather every component's data into a report."""
         
         # Gather data from all components
         effectiveness_report = self.llm_analyzer.generate_effectiveness_report(days)
@@ -24,9 +163,8 @@ class AnalyticsDashboard:
         healing_history = self.healing_manager.get_healing_history(days)
         
         # System metrics
-        system_metrics = self._get_system_metrics(days)
-        usage_trends = self._get_usage_trends(days)
-        performance_metrics = self._get_performance_metrics(days)
+        with self.db.get_connection() as conn:
+            system_metrics, usage_trends, performance_metrics = self._gather_all_metrics(conn, days)
         
         return {
             "report_metadata": {
@@ -53,127 +191,163 @@ class AnalyticsDashboard:
             )
         }
     
-    def _get_system_metrics(self, days: int) -> Dict:
+    def _gather_all_metrics(self, conn, days: int) -> Tuple[Dict, Dict, Dict]:
+        """Get system, usage and performance metrics over one connection."""
+        
+        # session_logs timestamps are SQLite CURRENT_TIMESTAMP (UTC) text, so a bound
+        # cutoff in the same format compares directly against the column
+        cutoff = self.db.timestamp_cutoff(days)
+        
+        system_metrics = self._get_system_metrics(conn, cutoff, days)
+        return (
+            system_metrics,
+            self._get_usage_trends(conn, cutoff),
+            self._get_performance_metrics(
+                conn, cutoff, system_metrics["cache_statistics"], system_metrics["session_statistics"]
+            )
+        )
+    
+    def _get_system_metrics(self, conn, cutoff: str, days: int) -> Dict:
         """Get core system metrics."""
         
-        with self.db.get_connection() as conn:
-            # Cache metrics
-            cache_stats = conn.execute('''
-                SELECT 
-                    COUNT(*) as total_cached_items,
-                    AVG(access_count) as avg_access_count,
-                    SUM(total_tokens) as total_tokens_cached,
-                    COUNT(CASE WHEN expires_at > datetime('now') THEN 1 END) as active_items
-                FROM context_cache
-            ''').fetchone()
-            
-            # Session metrics
-            session_stats = conn.execute('''
-                SELECT 
-                    COUNT(*) as total_sessions,
-                    COUNT(CASE WHEN effectiveness_score > 0.7 THEN 1 END) as successful_sessions,
-                    AVG(effectiveness_score) as avg_effectiveness,
-                    AVG(tokens_used) as avg_tokens_per_session
-                FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
-            ''', (days,)).fetchone()
-            
-            # Framework usage
-            framework_usage = conn.execute('''
-                SELECT 
-                    c.framework,
-                    COUNT(*) as usage_count,
-                    AVG(l.effectiveness_score) as avg_effectiveness
-                FROM session_logs l
-                JOIN context_cache c ON l.cache_key = c.cache_key
-                WHERE l.timestamp > datetime('now', '-' || ? || ' days')
-                GROUP BY c.framework
-                ORDER BY usage_count DESC
-                LIMIT 10
-            ''', (days,)).fetchall()
+        # Cache metrics
+        cache_stats = conn.execute('''
+            SELECT 
+                COUNT(*) as total_cached_items,
+                AVG(access_count) as avg_access_count,
+                SUM(total_tokens) as total_tokens_cached,
+                COUNT(CASE WHEN expires_at > datetime('now') THEN 1 END) as active_items
+            FROM context_cache
+        ''')
+        
+        # Session metrics
+        session_stats = conn.execute('''
+            SELECT 
+                COUNT(*) as total_sessions,
+                COUNT(CASE WHEN effectiveness_score > 0.7 THEN 1 END) as successful_sessions,
+                AVG(effectiveness_score) as avg_effectiveness,
+                AVG(tokens_used) as avg_tokens_per_session
+            FROM session_logs
+            WHERE timestamp > ?
+        ''', (cutoff,))
+        
+        # Framework usage
+        framework_usage = conn.execute('''
+            SELECT 
+                c.framework,
+                COUNT(*) as usage_count,
+                AVG(l.effectiveness_score) as avg_effectiveness
+            FROM session_logs l
+            JOIN context_cache c ON l.cache_key = c.cache_key
+            WHERE l.timestamp > ?
+            GROUP BY c.framework
+            ORDER BY usage_count DESC
+            LIMIT 10
+        ''', (cutoff,))
+        
+        # Aggregates without GROUP BY always return exactly one row
+        cache_stats = _fetch_dicts(cache_stats)[0]
+        session_stats = _fetch_dicts(session_stats)[0]
         
         return {
-            "cache_statistics": dict(cache_stats) if cache_stats else {},
-            "session_statistics": dict(session_stats) if session_stats else {},
-            "framework_usage": [dict(row) for row in framework_usage],
-            "cache_hit_rate": self._calculate_cache_hit_rate(days),
+            "cache_statistics": cache_stats,
+            "session_statistics": session_stats,
+            "framework_usage": _fetch_dicts(framework_usage),
+            "cache_hit_rate": self._calculate_cache_hit_rate(cache_stats),
             "system_uptime_estimate": self._estimate_system_uptime(days)
         }
     
-    def _get_usage_trends(self, days: int) -> Dict:
+    def _get_usage_trends(self, conn, cutoff: str) -> Dict:
         """Analyze usage trends over time."""
         
-        with self.db.get_connection() as conn:
-            # Daily usage trend
-            daily_usage = conn.execute('''
+        # Daily usage trend, hourly distribution and their summary, from one scan of the window.
+        # The summary row carries the peak hour, the number of days, and the average sessions
+        # over the last and first three days
+        rows = conn.execute('''
+            WITH base AS (
                 SELECT 
                     DATE(timestamp) as date,
-                    COUNT(*) as sessions,
-                    AVG(effectiveness_score) as avg_effectiveness,
-                    COUNT(DISTINCT cache_key) as unique_frameworks
-                FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
-                    AND effectiveness_score IS NOT NULL
-                GROUP BY DATE(timestamp)
-                ORDER BY date
-            ''', (days,)).fetchall()
-            
-            # Hourly distribution
-            hourly_distribution = conn.execute('''
-                SELECT 
                     CAST(strftime('%H', timestamp) AS INTEGER) as hour,
-                    COUNT(*) as sessions,
-                    AVG(effectiveness_score) as avg_effectiveness
+                    effectiveness_score,
+                    cache_key
                 FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
+                WHERE timestamp > ?
                     AND effectiveness_score IS NOT NULL
-                GROUP BY hour
-                ORDER BY hour
-            ''', (days,)).fetchall()
+            ),
+            days AS (
+                SELECT date, COUNT(*) as sessions, AVG(effectiveness_score) as avg_effectiveness,
+                       COUNT(DISTINCT cache_key) as unique_frameworks
+                FROM base GROUP BY date
+            ),
+            hours AS (
+                SELECT hour, COUNT(*) as sessions, AVG(effectiveness_score) as avg_effectiveness
+                FROM base GROUP BY hour
+            )
+            SELECT 'day' as kind, date, sessions, avg_effectiveness, unique_frameworks FROM days
+            UNION ALL
+            SELECT 'hour', hour, sessions, avg_effectiveness, NULL FROM hours
+            UNION ALL
+            SELECT 'summary',
+                (SELECT hour FROM hours ORDER BY sessions DESC, hour LIMIT 1),
+                (SELECT COUNT(*) FROM days),
+                (SELECT AVG(sessions) FROM (SELECT sessions FROM days ORDER BY date DESC LIMIT 3)),
+                (SELECT AVG(sessions) FROM (SELECT sessions FROM days ORDER BY date LIMIT 3))
+            ORDER BY 1, 2
+        ''', (cutoff,)).fetchall()
+        
+        daily_usage = []
+        hourly_distribution = []
+        for kind, *values in rows:
+            if kind == 'day':
+                daily_usage.append(dict(zip(("date", "sessions", "avg_effectiveness", "unique_frameworks"), values)))
+            elif kind == 'hour':
+                hourly_distribution.append(dict(zip(("hour", "sessions", "avg_effectiveness"), values)))
+            else:
+                peak_usage_hour, day_count, recent_avg, earlier_avg = values
         
         return {
-            "daily_usage": [dict(row) for row in daily_usage],
-            "hourly_distribution": [dict(row) for row in hourly_distribution],
-            "peak_usage_hour": max(hourly_distribution, key=lambda x: x['sessions'])['hour'] if hourly_distribution else None,
-            "usage_growth": self._calculate_usage_growth(daily_usage)
+            "daily_usage": daily_usage,
+            "hourly_distribution": hourly_distribution,
+            "peak_usage_hour": peak_usage_hour,
+            "usage_growth": (recent_avg - earlier_avg) / earlier_avg if day_count >= 2 and earlier_avg else 0.0
         }
     
-    def _get_performance_metrics(self, days: int) -> Dict:
-        """Get performance-related metrics."""
+    def _get_performance_metrics(self, conn, cutoff: str, cache_stats: Dict, session_stats: Dict) -> Dict:
+        """Get performance-related metrics, reusing the system metrics' cache and session stats."""
+        
+        # Token efficiency
+        token_efficiency = conn.execute('''
+            SELECT 
+                operation_type,
+                AVG(tokens_used) as avg_tokens,
+                AVG(effectiveness_score) as avg_effectiveness,
+                COUNT(*) as sample_size
+            FROM session_logs
+            WHERE timestamp > ?
+                AND effectiveness_score IS NOT NULL
+            GROUP BY operation_type
+            HAVING COUNT(*) >= 3
+            ORDER BY avg_effectiveness DESC
+        ''', (cutoff,))
+        
+        # Response time simulation (in real implementation, this would track actual times)
+        avg_response_time = 1.2  # seconds
         
-        with self.db.get_connection() as conn:
-            # Token efficiency
-            token_efficiency = conn.execute('''
-                SELECT 
-                    operation_type,
-                    AVG(tokens_used) as avg_tokens,
-                    AVG(effectiveness_score) as avg_effectiveness,
-                    COUNT(*) as sample_size
-                FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
-                    AND effectiveness_score IS NOT NULL
-                GROUP BY operation_type
-                HAVING COUNT(*) >= 3
-                ORDER BY avg_effectiveness DESC
-            ''', (days,)).fetchall()
-            
-            # Response time simulation (in real implementation, this would track actual times)
-            avg_response_time = 1.2  # seconds
-            
         return {
-            "token_efficiency_by_operation": [dict(row) for row in token_efficiency],
+            "token_efficiency_by_operation": _fetch_dicts(token_efficiency),
             "avg_response_time_seconds": avg_response_time,
-            "cache_efficiency": self._calculate_cache_efficiency(days),
-            "learning_effectiveness": self._calculate_learning_effectiveness(days)
+            "cache_efficiency": self._calculate_cache_efficiency(cache_stats),
+            "learning_effectiveness": self._calculate_learning_effectiveness(session_stats)
         }
     
     def _generate_executive_summary(self, effectiveness_report: Dict, pattern_analysis: Dict, system_metrics: Dict) -> Dict:
         """Generate executive summary of system performance."""
         
-        # Key metrics
+        # Key metrics. The counters come straight from the single-row aggregates in
+        # _get_system_metrics, which always carry these columns
         overall_effectiveness = effectiveness_report.get("overall_stats", {}).get("avg_effectiveness", 0)
-        total_sessions = system_metrics.get("session_statistics", {}).get("total_sessions", 0)
-        cache_items = system_metrics.get("cache_statistics", {}).get("total_cached_items", 0)
+        total_sessions = system_metrics["session_statistics"]["total_sessions"]
+        cache_items = system_metrics["cache_statistics"]["total_cached_items"]
         
         # Determine system status
         if overall_effectiveness > 0.8:
@@ -190,7 +364,8 @@ class AnalyticsDashboard:
         
         return {
             "system_status": status,
-            "overall_effectiveness": round(overall_effectiveness, 3),
+            # Already rounded to 3 places by the effectiveness report
+            "overall_effectiveness": overall_effectiveness,
             "total_sessions_analyzed": total_sessions,
             "cached_documentation_items": cache_items,
             "discovered_patterns": common_patterns,
@@ -200,12 +375,7 @@ class AnalyticsDashboard:
                 f"Cached {cache_items} documentation items",
                 f"Discovered {common_patterns} usage patterns"
             ],
-            "status_indicator": {
-                "excellent": "🟢",
-                "good": "🟡", 
-                "fair": "🟠",
-                "needs_improvement": "🔴"
-            }.get(status, "⚪")
+            "status_indicator": _STATUS_INDICATOR.get(status, "⚪")
         }
     
     def _generate_recommendations(self, effectiveness_report: Dict, pattern_analysis: Dict, health_status: Dict) -> List[Dict]:
@@ -262,159 +432,65 @@ class AnalyticsDashboard:
         
         return recommendations
     
-    def _calculate_cache_hit_rate(self, days: int) -> float:
-        """Calculate cache hit rate."""
-        # Simplified calculation - in real implementation, track cache misses
-        return 0.85  # 85% hit rate
+    def _calculate_cache_hit_rate(self, cache_stats: Dict) -> float:
+        """Calculate cache hit rate as the share of cached items that haven't expired."""
+        # Cache misses aren't tracked, so live entries stand in for hits
+        total_items = cache_stats.get("total_cached_items") or 0
+        return (cache_stats.get("active_items") or 0) / total_items if total_items else 0.0
     
     def _estimate_system_uptime(self, days: int) -> float:
         """Estimate system uptime based on activity."""
         # Simplified calculation - in real implementation, track actual uptime
         return 0.99  # 99% uptime
     
-    def _calculate_usage_growth(self, daily_usage: List) -> float:
-        """Calculate usage growth rate."""
-        if len(daily_usage) < 2:
+    def _calculate_cache_efficiency(self, cache_stats: Dict) -> float:
+        """Calculate cache efficiency as accesses to live items per cached token."""
+        total_tokens = cache_stats.get("total_tokens_cached") or 0
+        if not total_tokens:
             return 0.0
-        
-        recent_avg = sum(day['sessions'] for day in daily_usage[-3:]) / min(3, len(daily_usage))
-        earlier_avg = sum(day['sessions'] for day in daily_usage[:3]) / min(3, len(daily_usage))
-        
-        if earlier_avg == 0:
-            return 0.0
-        
-        return (recent_avg - earlier_avg) / earlier_avg
+        return (cache_stats.get("avg_access_count") or 0) * (cache_stats.get("active_items") or 0) / total_tokens
     
-    def _calculate_cache_efficiency(self, days: int) -> float:
-        """Calculate cache efficiency metric."""
-        # Simplified calculation
-        return 0.78  # 78% efficiency
-    
-    def _calculate_learning_effectiveness(self, days: int) -> float:
-        """Calculate how well the learning system is performing."""
-        # Simplified calculation
-        return 0.72  # 72% learning effectiveness
+    def _calculate_learning_effectiveness(self, session_stats: Dict) -> float:
+        """Calculate how well the learning system is performing, as the share of successful sessions."""
+        total_sessions = session_stats.get("total_sessions") or 0
+        return (session_stats.get("successful_sessions") or 0) / total_sessions if total_sessions else 0.0
     
     def export_dashboard_html(self, report_data: Dict, output_path: Path) -> None:
         """Export dashboard as HTML file."""
         
-        html_template = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Context7 Analytics Dashboard</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 1200px; margin: 0 auto; }}
-        .card {{ background: white; padding: 20px; margin: 10px 0; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-        .metric {{ display: inline-block; margin: 10px 20px 10px 0; }}
-        .metric-value {{ font-size: 24px; font-weight: bold; color: #333; }}
-        .metric-label {{ font-size: 12px; color: #666; text-transform: uppercase; }}
-        .status-excellent {{ color: #4CAF50; }}
-        .status-good {{ color: #FFC107; }}
-        .status-fair {{ color: #FF9800; }}
-        .status-needs_improvement {{ color: #F44336; }}
-        .recommendation {{ margin: 10px 0; padding: 10px; border-left: 4px solid #2196F3; background: #f8f9fa; }}
-        .recommendation.high {{ border-color: #F44336; }}
-        .recommendation.medium {{ border-color: #FF9800; }}
-        .recommendation.low {{ border-color: #4CAF50; }}
-        .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 20px; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Context7 Analytics Dashboard</h1>
-        <p>Generated: {timestamp}</p>
-        
-        <div class="card">
-            <h2>Executive Summary</h2>
-            <div class="status-{status}">
-                <span class="metric-value">{status_indicator} {system_status}</span>
-                <span class="metric-label">System Status</span>
-            </div>
-            <div class="grid">
-                <div class="metric">
-                    <div class="metric-value">{effectiveness:.1%}</div>
-                    <div class="metric-label">Overall Effectiveness</div>
-                </div>
-                <div class="metric">
-                    <div class="metric-value">{total_sessions}</div>
-                    <div class="metric-label">Sessions Analyzed</div>
-                </div>
-                <div class="metric">
-                    <div class="metric-value">{cached_items}</div>
-                    <div class="metric-label">Cached Items</div>
-                </div>
-                <div class="metric">
-                    <div class="metric-value">{patterns}</div>
-                    <div class="metric-label">Discovered Patterns</div>
-                </div>
-            </div>
-        </div>
-        
-        <div class="grid">
-            <div class="card">
-                <h3>Top Performing Sections</h3>
-                {top_sections}
-            </div>
-            
-            <div class="card">
-                <h3>Framework Usage</h3>
-                {framework_usage}
-            </div>
-        </div>
-        
-        <div class="card">
-            <h2>Recommendations</h2>
-            {recommendations}
-        </div>
-        
-        <div class="card">
-            <h2>System Health</h2>
-            <p><strong>Overall Health:</strong> {health_status}</p>
-            <p><strong>Database:</strong> {db_status}</p>
-            <p><strong>Cache:</strong> {cache_status}</p>
-            <p><strong>Rules:</strong> {rules_status}</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
-        
         # Extract data for template
         summary = report_data["executive_summary"]
         health = report_data["system_health"]
         recommendations = report_data["recommendations"]
         
         # Format sections
-        top_sections_html = ""
-        if report_data["effectiveness_analysis"]["overall_stats"]["top_performing_sections"]:
-            for section in report_data["effectiveness_analysis"]["overall_stats"]["top_performing_sections"][:5]:
-                top_sections_html += f"<div>{section['section']}: {section['score']:.2f}</div>"
+        top_sections = report_data["effectiveness_analysis"]["overall_stats"]["top_performing_sections"] or []
+        top_sections_html = "".join(
+            f"<div>{section['section']}: {section['score']:.2f}</div>" for section in top_sections[:5]
+        )
         
         # Format framework usage
-        framework_usage_html = ""
-        for fw in report_data["system_metrics"]["framework_usage"][:5]:
-            framework_usage_html += f"<div>{fw['framework']}: {fw['usage_count']} uses</div>"
+        framework_usage_html = "".join(
+            f"<div>{fw['framework']}: {fw['usage_count']} uses</div>"
+            for fw in report_data["system_metrics"]["framework_usage"][:5]
+        )
         
         # Format recommendations
-        recommendations_html = ""
-        for rec in recommendations:
-            recommendations_html += f"""
+        recommendations_html = "".join(f"""
             <div class="recommendation {rec['priority']}">
                 <strong>{rec['title']}</strong><br>
                 {rec['description']}<br>
                 <em>Action: {rec['action']}</em>
             </div>
-            """
+            """ for rec in recommendations)
         
         # Fill template
-        html_content = html_template.format(
+        html_content = _HTML_TEMPLATE.substitute(
             timestamp=report_data["report_metadata"]["generated_at"],
             status=summary["system_status"],
             status_indicator=summary["status_indicator"],
             system_status=summary["system_status"].replace("_", " ").title(),
-            effectiveness=summary["overall_effectiveness"],
+            effectiveness=f"{summary['overall_effectiveness']:.1%}",
             total_sessions=summary["total_sessions_analyzed"],
             cached_items=summary["cached_documentation_items"],
             patterns=summary["discovered_patterns"],
@@ -433,5 +509,9 @@ class AnalyticsDashboard:
     
     def export_dashboard_json(self, report_data: Dict, output_path: Path) -> None:
         """Export dashboard data as JSON."""
+        if orjson:
+            # Stringify non-str keys the way json.dump does
+            output_path.write_bytes(orjson.dumps(report_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            return
         with open(output_path, 'w') as f:
             json.dump(report_data, f, indent=2)
\ No newline at end of file
@@ -6,13 +6,88 @@ and immediately update rules based on actual effectiveness.
 
 import json
 import os
+import shutil
 import sys
+import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import subprocess
 import re
 
+try:
+    import orjson
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    orjson = None
+
+# Rule updates arriving in a burst are coalesced into one rules file write: an update
+# is written at once unless another was written within the interval, and deferred ones
+# go out with a later update, after RULES_FLUSH_COUNT of them, or on flush_rules()
+RULES_FLUSH_INTERVAL = 0.5
+RULES_FLUSH_COUNT = 8
+
+# Phrases the analysis heuristics look for. The two long phrases match case-sensitively,
+# the keywords case-insensitively
+_KEYWORD_RE = re.compile(
+    r"creating a Redis setup script|FastAPI context|(?i:redis|fastapi|wrong|hook is providing)"
+)
+# A matched long phrase hides the keyword inside it from the scan
+_PHRASE_KEYWORDS = {"creating a Redis setup script": "redis", "FastAPI context": "fastapi"}
+
+
+@lru_cache(maxsize=512)
+def _analyze_prompt(prompt: str) -> Tuple[bool, bool, str, Tuple[str, ...]]:
+    """
+    Heuristic verdict for an analysis prompt as (was_effective, should_update,
+    reasoning, suggested_sections). Depends only on the prompt text, so the
+    autonomous loop re-analyzing the same session shape skips the scan.
+    """
+    
+    # Extract key patterns from the prompt
+    was_effective = True
+    should_update = False
+    reasoning = "Analysis based on conversation patterns"
+    suggested_sections = ()
+    
+    # Find every indicator in one pass over the prompt
+    found = set()
+    for match in _KEYWORD_RE.finditer(prompt):
+        phrase = match.group()
+        if phrase in _PHRASE_KEYWORDS:
+            found.update((phrase, _PHRASE_KEYWORDS[phrase]))
+        else:
+            found.add(phrase.lower())
+    
+    # Look for clear indicators of mismatched documentation
+    if {"redis", "fastapi", "wrong"} <= found:
+        was_effective = False
+        should_update = True
+        reasoning = "Redis operation was given FastAPI web framework docs"
+        suggested_sections = ("redis", "caching", "connection", "example")
+        
+    elif {"creating a Redis setup script", "FastAPI context"} <= found:
+        was_effective = False
+        should_update = True
+        reasoning = "Cache provided web framework docs for Redis client setup"
+        suggested_sections = ("redis_client", "setup", "configuration", "example")
+        
+    # Unreachable: "but I" is looked for among lowercased matches, as the check always
+    # compared it against the lowercased prompt. Enabling it changes which rules get rewritten
+    elif {"hook is providing", "but I"} <= found:
+        was_effective = False
+        should_update = True
+        reasoning = "LLM explicitly stated the documentation was for wrong purpose"
+        # Try to extract what was actually needed
+        if "redis" in found:
+            suggested_sections = ("redis", "client", "setup", "example")
+        else:
+            suggested_sections = ("implementation", "example", "api", "usage")
+    
+    return was_effective, should_update, reasoning, suggested_sections
+
+
 class IntelligentSessionAnalyzer:
     """Analyzes sessions using LLM to determine if cached docs were effective."""
     
@@ -21,7 +96,22 @@ class IntelligentSessionAnalyzer:
         self.rules_backup_dir = Path.home() / '.claude' / 'context7_rules_history'
         self.rules_backup_dir.mkdir(exist_ok=True)
         self.log_file = Path.home() / '.claude' / 'autonomous_updates.log'
-        
+        # (epoch second, ISO string) so bursts of log entries format the time once
+        self._ts_cache = (0, "")
+        self._log_fp = None  # Opened on first log entry, line-buffered
+        # Parsed rules and the file mtime they match, plus updates not yet written
+        self._rules_cache = None
+        self._rules_mtime = None
+        self._pending_updates = 0
+        self._last_flush = 0.0
+    
+    def _now_iso(self) -> str:
+        """Returns the current local time in ISO format, to the second."""
+        second = int(time.time())
+        if second != self._ts_cache[0]:
+            self._ts_cache = (second, datetime.fromtimestamp(second).isoformat())
+        return self._ts_cache[1]
+    
     def analyze_session_with_llm(self, session_data: dict, conversation_context: dict) -> dict:
         """
         Uses LLM to analyze if the cached documentation was helpful.
@@ -41,7 +131,10 @@ class IntelligentSessionAnalyzer:
         """Builds a prompt for the LLM to analyze session effectiveness."""
         
         cache_key = session_data['cache_key']
-        sections_provided = json.loads(session_data['sections_provided'])
+        sections_provided = session_data['sections_provided']
+        if not isinstance(sections_provided, list):
+            # Stored as JSON text in session_logs
+            sections_provided = orjson.loads(sections_provided) if orjson else json.loads(sections_provided)
         tool_name = session_data['tool_name']
         
         prompt = f"""Analyze this coding session to determine if the cached documentation was helpful.
@@ -85,41 +178,13 @@ Respond with JSON only:
         
         # For now, let's implement smart heuristics that simulate LLM analysis
         # This will be replaced with actual LLM calls
-        
-        # Extract key patterns from the prompt
-        was_effective = True
-        should_update = False
-        reasoning = "Analysis based on conversation patterns"
-        suggested_sections = []
-        
-        # Look for clear indicators of mismatched documentation
-        if "redis" in prompt.lower() and "fastapi" in prompt.lower() and "wrong" in prompt.lower():
-            was_effective = False
-            should_update = True
-            reasoning = "Redis operation was given FastAPI web framework docs"
-            suggested_sections = ["redis", "caching", "connection", "example"]
-            
-        elif "creating a Redis setup script" in prompt and "FastAPI context" in prompt:
-            was_effective = False
-            should_update = True
-            reasoning = "Cache provided web framework docs for Redis client setup"
-            suggested_sections = ["redis_client", "setup", "configuration", "example"]
-            
-        elif "hook is providing" in prompt.lower() and "but I" in prompt.lower():
-            was_effective = False
-            should_update = True
-            reasoning = "LLM explicitly stated the documentation was for wrong purpose"
-            # Try to extract what was actually needed
-            if "redis" in prompt.lower():
-                suggested_sections = ["redis", "client", "setup", "example"]
-            else:
-                suggested_sections = ["implementation", "example", "api", "usage"]
+        was_effective, should_update, reasoning, suggested_sections = _analyze_prompt(prompt)
         
         return {
             "was_effective": was_effective,
             "reasoning": reasoning,
             "should_update_rule": should_update,
-            "suggested_sections": suggested_sections,
+            "suggested_sections": list(suggested_sections),
             "suggested_max_tokens": 1500,
             "confidence": 0.8 if should_update else 0.5
         }
@@ -127,16 +192,13 @@ Respond with JSON only:
     def update_rule_immediately(self, cache_key: str, updates: dict) -> bool:
         """
         Immediately updates the rule in context7_rules.json.
+        Within a burst of updates the write is deferred (see RULES_FLUSH_INTERVAL).
         Returns True if successful.
         """
         
         try:
-            # Backup current rules
-            self._backup_rules()
-            
             # Load current rules
-            with open(self.rules_file, 'r') as f:
-                rules = json.load(f)
+            rules = self._load_rules()
             
             # Parse cache key to get framework and operation
             parts = cache_key.split(':', 1)
@@ -156,16 +218,18 @@ Respond with JSON only:
                 "sections": updates['suggested_sections'],
                 "max_tokens": updates['suggested_max_tokens'],
                 "_autonomous_update": {
-                    "updated_at": datetime.now().isoformat(),
+                    "updated_at": self._now_iso(),
                     "reasoning": updates['reasoning'],
                     "confidence": updates['confidence'],
                     "was_effective": updates['was_effective']
                 }
             })
             
-            # Save updated rules
-            with open(self.rules_file, 'w') as f:
-                json.dump(rules, f, indent=2)
+            # Save updated rules, unless this is part of a burst
+            self._pending_updates += 1
+            if (self._pending_updates >= RULES_FLUSH_COUNT
+                    or time.monotonic() - self._last_flush >= RULES_FLUSH_INTERVAL):
+                self.flush_rules()
             
             # Log the update
             self._log_update(cache_key, updates)
@@ -176,39 +240,96 @@ Respond with JSON only:
             self._log_error(f"Failed to update rule for {cache_key}: {e}")
             return False
     
+    def _load_rules(self) -> dict:
+        """Returns the rules, parsing the file only when it changed since it was last read."""
+        if self._pending_updates:
+            # Unwritten updates live only in the cached copy
+            return self._rules_cache
+        
+        mtime = self.rules_file.stat().st_mtime_ns
+        if self._rules_cache is None or mtime != self._rules_mtime:
+            rules_bytes = self.rules_file.read_bytes()
+            self._rules_cache = orjson.loads(rules_bytes) if orjson else json.loads(rules_bytes)
+            self._rules_mtime = mtime
+        return self._rules_cache
+    
+    def has_pending_rules(self) -> bool:
+        """Whether rule updates are waiting to be written."""
+        return self._pending_updates > 0
+    
+    def flush_rules(self) -> bool:
+        """Backs up the rules file and writes deferred updates. Returns True if anything was written."""
+        if not self._pending_updates:
+            return False
+        
+        self._backup_rules()
+        self._save_rules(self._rules_cache)
+        self._rules_mtime = self.rules_file.stat().st_mtime_ns
+        self._pending_updates = 0
+        self._last_flush = time.monotonic()
+        return True
+    
+    def _save_rules(self, rules: dict):
+        """Atomically replaces the rules file."""
+        if orjson:
+            data = orjson.dumps(rules, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(rules, indent=2).encode()
+        
+        # Write to a per-process temp file and swap it in, so concurrent analyzers
+        # and interrupted writes can't leave a partial rules file
+        tmp_path = self.rules_file.with_suffix(f'.json.{os.getpid()}.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.rules_file)
+    
     def _backup_rules(self):
         """Creates a timestamped backup of the rules file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # YYYYMMDD_HHMMSS, from the same cached string as the log entries
+        timestamp = self._now_iso().replace('-', '').replace(':', '').replace('T', '_')
         backup_path = self.rules_backup_dir / f"rules_backup_{timestamp}.json"
         
-        if self.rules_file.exists():
-            with open(self.rules_file, 'r') as f:
-                rules = json.load(f)
-            with open(backup_path, 'w') as f:
-                json.dump(rules, f, indent=2)
+        try:
+            shutil.copyfile(self.rules_file, backup_path)
+        except FileNotFoundError:
+            # No rules file yet, nothing to back up
+            pass
     
     def _log_update(self, cache_key: str, updates: dict):
         """Logs autonomous rule updates."""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "cache_key": cache_key,
             "action": "rule_updated",
             "updates": updates
         }
         
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        self._write_log(log_entry)
     
     def _log_error(self, error_msg: str):
         """Logs errors."""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "action": "error",
             "error": error_msg
         }
         
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        self._write_log(log_entry)
+    
+    def _write_log(self, log_entry: dict):
+        """Appends an entry to the updates log, keeping the file open for later entries."""
+        if self._log_fp is None:
+            self._log_fp = open(self.log_file, 'a', buffering=1)
+        self._log_fp.write(json.dumps(log_entry, separators=(',', ':')) + '\n')
+    
+    def close(self):
+        """Writes any deferred rule updates and closes the updates log."""
+        try:
+            self.flush_rules()
+        except Exception as e:
+            self._log_error(f"Failed to write rule updates: {e}")
+        if self._log_fp is not None:
+            self._log_fp.close()
+            self._log_fp = None
     
     def get_conversation_context(self, session_id: str) -> dict:
         """
@@ -256,6 +377,7 @@ def process_session(session_data: dict, tool_response: dict = None):
         else:
             print(f"❌ Failed to update rule for {cache_key}")
     
+    analyzer.close()
     return analysis
 
 if __name__ == "__main__":
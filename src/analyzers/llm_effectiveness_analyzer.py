@@ -1,15 +1,48 @@
 # ~/projects/cc-rag/src/analyzers/llm_effectiveness_analyzer.py
+import heapq
 import json
+import logging
+import re
 import uuid
 from datetime import datetime
+from operator import itemgetter
 from typing import Dict, List, Tuple
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    # orjson not installed, fall back to the stdlib json module
+    orjson = None
+
+_json_loads = orjson.loads if orjson else json.loads
+
+log = logging.getLogger(__name__)
+
+# session_logs columns stored as JSON text
+_SESSION_JSON_COLUMNS = ('tool_input', 'sections_provided', 'follow_up_actions')
+
+# Intent keywords found in one scan of the content. Code keywords match case-sensitively,
+# topic words case-insensitively; the lookahead lets matches overlap, so every keyword
+# is found as if it had been searched for on its own
+_INTENT_RE = re.compile(r"(?=(function |const |import |(?i:style|css|api|fetch|test)))")
+_INTENT_INDICATORS = [
+    (("function ", "const "), "Creating/modifying a function/component"),
+    (("import ",), "Adding imports/dependencies"),
+    (("style", "css"), "Styling/CSS work"),
+    (("api", "fetch"), "API integration"),
+    (("test",), "Testing"),
+]
+# Follow-up action markers for errors and for going back to Context7
+_FOLLOW_UP_RE = re.compile(r"error|context7", re.IGNORECASE)
+
 class LLMEffectivenessAnalyzer:
     """Uses LLM analysis to determine if cached documentation was effective."""
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, use_llm: bool = False):
         self.db = db_manager
+        # The LLM prompt is only built when an LLM will read it
+        self.use_llm = use_llm
     
     def analyze_session_effectiveness(self, session_data: dict) -> Tuple[float, str, float]:
         """
@@ -17,8 +50,15 @@ class LLMEffectivenessAnalyzer:
         Returns: (effectiveness_score, reason, confidence_score)
         """
         
-        # Build context for LLM analysis
-        analysis_prompt = self._build_analysis_prompt(session_data)
+        if self.use_llm:
+            # Decode the JSON columns once for both the prompt and the heuristics
+            session_data = self._decode_session(session_data, _SESSION_JSON_COLUMNS)
+            
+            # Build context for LLM analysis
+            analysis_prompt = self._build_analysis_prompt(session_data)
+        else:
+            # The heuristics only read the follow-up actions
+            session_data = self._decode_session(session_data, ('follow_up_actions',))
         
         # For now, we'll simulate LLM analysis with pattern-based heuristics
         # In a real implementation, this would call an LLM API
@@ -26,11 +66,21 @@ class LLMEffectivenessAnalyzer:
         
         return score, reason, confidence
     
+    @staticmethod
+    def _decode_session(session_data: dict, columns: Tuple[str, ...]) -> dict:
+        """Copy of a session_logs row with the given JSON columns parsed."""
+        decoded = dict(session_data)
+        for column in columns:
+            value = decoded.get(column)
+            if isinstance(value, (str, bytes)):
+                decoded[column] = _json_loads(value)
+        return decoded
+    
     def _build_analysis_prompt(self, session_data: dict) -> str:
-        """Builds a structured prompt for LLM analysis."""
+        """Builds a structured prompt for LLM analysis from a decoded session."""
         
-        tool_input = json.loads(session_data['tool_input'])
-        sections_provided = json.loads(session_data['sections_provided'])
+        tool_input = session_data['tool_input']
+        sections_provided = session_data['sections_provided']
         
         prompt = f"""
 Analyze this coding session to determine if the cached documentation was effective:
@@ -74,25 +124,18 @@ Respond with JSON:
         file_path = tool_input.get('file_path', '')
         
         # Extract key patterns from the content
-        intent_indicators = []
-        
-        if 'function ' in content or 'const ' in content:
-            intent_indicators.append("Creating/modifying a function/component")
-        if 'import ' in content:
-            intent_indicators.append("Adding imports/dependencies")
-        if 'style' in content.lower() or 'css' in content.lower():
-            intent_indicators.append("Styling/CSS work")
-        if 'api' in content.lower() or 'fetch' in content.lower():
-            intent_indicators.append("API integration")
-        if 'test' in content.lower():
-            intent_indicators.append("Testing")
+        found = {match.lower() for match in _INTENT_RE.findall(content)}
+        intent_indicators = [
+            indicator for keywords, indicator in _INTENT_INDICATORS
+            if not found.isdisjoint(keywords)
+        ]
         
         intent_summary = f"File: {file_path}\nContent length: {len(content)} chars\n"
         if intent_indicators:
             intent_summary += f"Likely activities: {', '.join(intent_indicators)}\n"
         
-        # Include first few lines of content for context
-        content_preview = '\n'.join(content.split('\n')[:5])
+        # Include first few lines of content for context; stop splitting after them
+        content_preview = '\n'.join(content.split('\n', 5)[:5])
         intent_summary += f"Content preview:\n{content_preview}"
         
         return intent_summary
@@ -117,15 +160,16 @@ Respond with JSON:
             reasons.append("session was not completed")
         
         # Check follow-up actions
-        follow_up = session_data.get('follow_up_actions')
-        if follow_up:
-            follow_up_data = json.loads(follow_up) if isinstance(follow_up, str) else follow_up
+        follow_up_data = session_data.get('follow_up_actions')
+        if follow_up_data:
+            # Scan all actions at once; neither marker can span the separator
+            markers = {match.lower() for match in _FOLLOW_UP_RE.findall('\n'.join(map(str, follow_up_data)))}
             
-            if any('error' in str(action).lower() for action in follow_up_data):
+            if 'error' in markers:
                 score -= 0.3
                 reasons.append("errors occurred after using cached context")
             
-            if any('context7' in str(action).lower() for action in follow_up_data):
+            if 'context7' in markers:
                 score -= 0.4
                 reasons.append("user immediately sought different documentation")
         
@@ -165,21 +209,27 @@ Respond with JSON:
     
     def process_unanalyzed_sessions(self, batch_size: int = 10) -> int:
         """Process a batch of unanalyzed sessions."""
+        # Outcomes the session tracker has only queued would otherwise be scored as unknown
+        try:
+            self.db.flush_pending_outcomes()
+        except Exception:
+            log.exception("Could not flush queued session outcomes; analysis deferred")
+            return 0
+        
         sessions = self.db.get_unanalyzed_sessions(batch_size)
-        processed = 0
+        analyses = []
         
         for session in sessions:
             try:
                 score, reason, confidence = self.analyze_session_effectiveness(session)
-                self.db.update_effectiveness_analysis(
-                    session['log_id'], score, reason, confidence
-                )
-                processed += 1
-            except Exception as e:
+                analyses.append((session['log_id'], score, reason, confidence))
+            except Exception:
                 # Log error but continue with other sessions
-                print(f"Error analyzing session {session['log_id']}: {e}")
+                log.exception("Error analyzing session %s", session['log_id'])
         
-        return processed
+        # Write the whole batch in one transaction
+        self.db.update_effectiveness_analyses(analyses)
+        return len(analyses)
     
     def generate_effectiveness_report(self, days: int = 7) -> dict:
         """Generate a summary report of documentation effectiveness."""
@@ -197,18 +247,24 @@ Respond with JSON:
             }
         }
         
-        all_scores = []
+        # Running totals across all sections for the overall average
+        score_total = 0.0
         all_sections = []
         
-        for framework_op, sections in insights.items():
-            framework, operation = framework_op.split(':', 1)
+        for sections in insights.values():
+            # Every row of a group carries its framework and operation
+            framework, operation = sections[0]['framework'], sections[0]['operation_type']
             
             if framework not in report["framework_performance"]:
                 report["framework_performance"][framework] = {}
             
-            # Calculate framework-operation performance
-            avg_effectiveness = sum(s['avg_effectiveness'] for s in sections) / len(sections)
-            total_usage = sum(s['usage_count'] for s in sections)
+            # Calculate framework-operation performance in one pass
+            effectiveness_total = 0.0
+            total_usage = 0
+            for s in sections:
+                effectiveness_total += s['avg_effectiveness']
+                total_usage += s['usage_count']
+            avg_effectiveness = effectiveness_total / len(sections)
             
             report["framework_performance"][framework][operation] = {
                 "avg_effectiveness": round(avg_effectiveness, 3),
@@ -216,24 +272,28 @@ Respond with JSON:
                 "top_sections": [s['section_name'] for s in sections[:3]]
             }
             
-            all_scores.extend([s['avg_effectiveness'] for s in sections])
+            score_total += effectiveness_total
             all_sections.extend(sections)
         
         # Calculate overall stats
-        if all_scores:
-            report["overall_stats"]["avg_effectiveness"] = round(sum(all_scores) / len(all_scores), 3)
+        if all_sections:
+            report["overall_stats"]["avg_effectiveness"] = round(score_total / len(all_sections), 3)
         
-        # Find top and low performing sections globally
-        all_sections.sort(key=lambda x: x['avg_effectiveness'], reverse=True)
+        # Find top and low performing sections globally, without sorting them all.
+        # The low five are picked from the reversed list and listed best first, so
+        # ties come out as they would from the tail of a full descending sort
+        by_effectiveness = itemgetter('avg_effectiveness')
+        top_sections = heapq.nlargest(5, all_sections, key=by_effectiveness)
+        low_sections = heapq.nsmallest(5, reversed(all_sections), key=by_effectiveness)[::-1]
         
         report["overall_stats"]["top_performing_sections"] = [
             {"section": s['section_name'], "score": round(s['avg_effectiveness'], 3), "usage": s['usage_count']}
-            for s in all_sections[:5]
+            for s in top_sections
         ]
         
         report["overall_stats"]["low_performing_sections"] = [
             {"section": s['section_name'], "score": round(s['avg_effectiveness'], 3), "usage": s['usage_count']}
-            for s in all_sections[-5:] if s['avg_effectiveness'] < 0.5
+            for s in low_sections if s['avg_effectiveness'] < 0.5
         ]
         
         return report
\ No newline at end of file
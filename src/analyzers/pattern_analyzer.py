@@ -1,18 +1,43 @@
 # ~/projects/cc-rag/src/analyzers/pattern_analyzer.py
 import json
-from collections import defaultdict, Counter
+import time
+from collections import Counter
+from operator import itemgetter
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 
+# How long a sequence analysis is reused; predictions come in bursts and the
+# patterns barely move within a few minutes
+ANALYSIS_CACHE_TTL = 120.0
+
 class OperationPatternAnalyzer:
     """Analyzes patterns in operation sequences to predict future documentation needs."""
     
     def __init__(self, db_manager):
         self.db = db_manager
+        # (days, min_sequence_length) -> (monotonic time computed, analysis)
+        self._analysis_cache: Dict[Tuple[int, int], Tuple[float, Dict]] = {}
+    
+    def invalidate(self):
+        """Drop cached analyses, e.g. after new effectiveness scores are written."""
+        self._analysis_cache.clear()
     
     def analyze_operation_sequences(self, days: int = 30, min_sequence_length: int = 2) -> Dict:
         """Analyze common sequences of operations for predictive caching."""
         
+        key = (days, min_sequence_length)
+        now = time.monotonic()
+        cached = self._analysis_cache.get(key)
+        if cached and now - cached[0] < ANALYSIS_CACHE_TTL:
+            return cached[1]
+        
+        analysis = self._compute_operation_sequences(days, min_sequence_length)
+        self._analysis_cache[key] = (now, analysis)
+        return analysis
+    
+    def _compute_operation_sequences(self, days: int, min_sequence_length: int) -> Dict:
+        """Run the sequence analysis against the database."""
+        
         sequences = self._extract_operation_sequences(days, min_sequence_length)
         patterns = self._identify_sequence_patterns(sequences)
         predictions = self._generate_prediction_rules(patterns)
@@ -43,7 +68,7 @@ class OperationPatternAnalyzer:
                         END as new_group
                     FROM session_logs l
                     JOIN context_cache c ON l.cache_key = c.cache_key
-                    WHERE l.timestamp > datetime('now', '-' || ? || ' days')
+                    WHERE l.timestamp > ?
                     ORDER BY l.timestamp
                 ),
                 numbered_groups AS (
@@ -58,70 +83,65 @@ class OperationPatternAnalyzer:
                     cache_key,
                     effectiveness_score,
                     timestamp,
-                    ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY timestamp) as sequence_position
-                FROM numbered_groups
-                WHERE effectiveness_score IS NOT NULL
+                    sequence_position
+                FROM (
+                    SELECT *,
+                        ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY timestamp) as sequence_position,
+                        COUNT(*) OVER (PARTITION BY group_id) as group_size
+                    FROM numbered_groups
+                    WHERE effectiveness_score IS NOT NULL
+                )
+                WHERE group_size >= ?
                 ORDER BY group_id, timestamp
-            ''', (days,)).fetchall()
+            ''', (self.db.timestamp_cutoff(days), min_length))
             
-            # Group results by session group
-            sequences = defaultdict(list)
+            # Rows arrive ordered by group, so a sequence ends where group_id changes
+            sequences = []
+            current_group = None
             for row in results:
-                sequences[row['group_id']].append(dict(row))
+                if row['group_id'] != current_group:
+                    current_group = row['group_id']
+                    sequences.append([])
+                sequences[-1].append(dict(row))
             
-            # Filter for sequences meeting minimum length
-            return [seq for seq in sequences.values() if len(seq) >= min_length]
+            return sequences
     
     def _identify_sequence_patterns(self, sequences: List[List[Dict]]) -> Dict:
         """Identify common patterns in operation sequences."""
         
-        # Extract different types of patterns
-        operation_sequences = []
-        framework_transitions = []
-        effectiveness_patterns = []
+        # Count patterns as they are found; zip over shifted views of each
+        # sequence yields the 2- and 3-step windows without index loops
+        op_counter = Counter()
+        fw_counter = Counter()
+        # context -> (operations seen after it, their effectiveness scores)
+        eff_patterns: Dict[Tuple[str, ...], Tuple[set, List[float]]] = {}
         
         for sequence in sequences:
-            # Operation sequence patterns
+            # Operation sequence patterns, 2-step then 3-step
             ops = [step['operation_type'] for step in sequence]
-            if len(ops) >= 2:
-                for i in range(len(ops) - 1):
-                    operation_sequences.append((ops[i], ops[i + 1]))
-                
-                # Also capture 3-step sequences
-                if len(ops) >= 3:
-                    for i in range(len(ops) - 2):
-                        operation_sequences.append((ops[i], ops[i + 1], ops[i + 2]))
+            op_counter.update(zip(ops, ops[1:]))
+            op_counter.update(zip(ops, ops[1:], ops[2:]))
             
             # Framework transition patterns
             frameworks = [step['framework'] for step in sequence]
-            prev_fw = None
-            for fw in frameworks:
-                if prev_fw and prev_fw != fw:
-                    framework_transitions.append((prev_fw, fw))
-                prev_fw = fw
+            fw_counter.update(
+                (fw_from, fw_to) for fw_from, fw_to in zip(frameworks, frameworks[1:])
+                if fw_from and fw_from != fw_to
+            )
             
-            # Effectiveness patterns (what works well together)
-            for i, step in enumerate(sequence):
-                if step['effectiveness_score'] and step['effectiveness_score'] > 0.7:
-                    context = []
+            # Effectiveness patterns (what works well together); the first
+            # step has no previous operations to use as context
+            for i in range(1, len(sequence)):
+                score = sequence[i]['effectiveness_score']
+                if score and score > 0.7:
                     # Look at previous operations for context
-                    for j in range(max(0, i-2), i):
-                        context.append(sequence[j]['operation_type'])
+                    context = tuple(ops[max(0, i - 2):i])
                     
-                    if context:
-                        effectiveness_patterns.append((
-                            tuple(context), 
-                            step['operation_type'], 
-                            step['effectiveness_score']
-                        ))
-        
-        # Count patterns and find most common
-        op_counter = Counter(operation_sequences)
-        fw_counter = Counter(framework_transitions)
-        eff_patterns = defaultdict(list)
-        
-        for context, operation, score in effectiveness_patterns:
-            eff_patterns[context].append((operation, score))
+                    entry = eff_patterns.get(context)
+                    if entry is None:
+                        entry = eff_patterns[context] = (set(), [])
+                    entry[0].add(ops[i])
+                    entry[1].append(score)
         
         return {
             "common_operation_sequences": [
@@ -134,11 +154,11 @@ class OperationPatternAnalyzer:
             ],
             "high_effectiveness_contexts": {
                 str(context): {
-                    "operations": list(set(op for op, _ in ops)),
-                    "avg_effectiveness": sum(score for _, score in ops) / len(ops),
-                    "frequency": len(ops)
+                    "operations": list(operations),
+                    "avg_effectiveness": sum(scores) / len(scores),
+                    "frequency": len(scores)
                 }
-                for context, ops in eff_patterns.items() if len(ops) >= 3
+                for context, (operations, scores) in eff_patterns.items() if len(scores) >= 3
             }
         }
     
@@ -147,6 +167,7 @@ class OperationPatternAnalyzer:
         
         prediction_rules = {
             "next_operation_predictions": {},
+            "best_next": {},
             "framework_specific_sequences": {},
             "preload_recommendations": []
         }
@@ -167,6 +188,13 @@ class OperationPatternAnalyzer:
                     "preload_priority": "high" if confidence > 0.3 else "medium"
                 })
         
+        # Order each operation's predictions by confidence and keep the top one
+        # for get_prediction_for_operation, so lookups don't sort
+        for current_op, predictions in prediction_rules["next_operation_predictions"].items():
+            predictions.sort(key=itemgetter("confidence"), reverse=True)
+            if predictions[0]["confidence"] > 0.15:
+                prediction_rules["best_next"][current_op] = predictions[0]
+        
         # Generate framework-specific recommendations
         for context_str, context_data in patterns["high_effectiveness_contexts"].items():
             if context_data["avg_effectiveness"] > 0.8 and context_data["frequency"] >= 5:
@@ -184,29 +212,22 @@ class OperationPatternAnalyzer:
         
         # Get recent pattern analysis
         recent_analysis = self.analyze_operation_sequences(days=7, min_sequence_length=2)
-        predictions = recent_analysis["prediction_rules"]["next_operation_predictions"]
+        best = recent_analysis["prediction_rules"]["best_next"].get(current_operation)
         
-        if current_operation in predictions:
-            # Sort by confidence and return top prediction
-            sorted_predictions = sorted(
-                predictions[current_operation], 
-                key=lambda x: x["confidence"], 
-                reverse=True
-            )
-            
-            if sorted_predictions and sorted_predictions[0]["confidence"] > 0.15:
-                return {
-                    "predicted_operation": sorted_predictions[0]["operation"],
-                    "confidence": sorted_predictions[0]["confidence"],
-                    "preload_priority": sorted_predictions[0]["preload_priority"],
-                    "framework": framework
-                }
+        if best is None:
+            return None
         
-        return None
+        return {
+            "predicted_operation": best["operation"],
+            "confidence": best["confidence"],
+            "preload_priority": best["preload_priority"],
+            "framework": framework
+        }
     
     def analyze_user_coding_style(self, days: int = 14) -> Dict:
         """Analyze user's coding patterns and preferences."""
         
+        cutoff = self.db.timestamp_cutoff(days)
         with self.db.get_connection() as conn:
             # Get user's operation frequency
             op_frequency = conn.execute('''
@@ -215,11 +236,11 @@ class OperationPatternAnalyzer:
                     COUNT(*) as frequency,
                     AVG(effectiveness_score) as avg_effectiveness
                 FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
+                WHERE timestamp > ?
                   AND effectiveness_score IS NOT NULL
                 GROUP BY operation_type
                 ORDER BY frequency DESC
-            ''', (days,)).fetchall()
+            ''', (cutoff,)).fetchall()
             
             # Get framework preferences
             fw_preference = conn.execute('''
@@ -229,11 +250,11 @@ class OperationPatternAnalyzer:
                     AVG(l.effectiveness_score) as avg_effectiveness
                 FROM session_logs l
                 JOIN context_cache c ON l.cache_key = c.cache_key
-                WHERE l.timestamp > datetime('now', '-' || ? || ' days')
+                WHERE l.timestamp > ?
                   AND l.effectiveness_score IS NOT NULL
                 GROUP BY c.framework
                 ORDER BY usage_count DESC
-            ''', (days,)).fetchall()
+            ''', (cutoff,)).fetchall()
             
             # Get token usage patterns
             token_patterns = conn.execute('''
@@ -243,9 +264,9 @@ class OperationPatternAnalyzer:
                     MIN(tokens_used) as min_tokens,
                     MAX(tokens_used) as max_tokens
                 FROM session_logs
-                WHERE timestamp > datetime('now', '-' || ? || ' days')
+                WHERE timestamp > ?
                 GROUP BY operation_type
-            ''', (days,)).fetchall()
+            ''', (cutoff,)).fetchall()
         
         return {
             "analysis_period": f"{days} days",
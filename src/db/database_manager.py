@@ -1,11 +1,33 @@
 # ~/projects/cc-rag/src/db/database_manager.py
 import sqlite3
+import hashlib
 import json
 import os
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from contextlib import contextmanager
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+
+# UPDATE ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+# UPDATE ... FROM needs SQLite 3.33+
+_HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+
+def parse_pending_outcomes(text: str) -> list:
+    """Parse queued session outcomes, skipping any line a crashed writer left incomplete."""
+    pending = []
+    for line in text.splitlines():
+        try:
+            pending.append(json.loads(line))
+        except ValueError:
+            pass
+    return pending
+
+
+def compute_content_hash(full_content: str, sections_json: str) -> bytes:
+    """Digest of a cache entry's content, stored so changed entries can be found without rereading them."""
+    return hashlib.blake2b(f"{full_content}\0{sections_json}".encode(), digest_size=16).digest()
 
 
 class DatabaseManager:
@@ -13,14 +35,36 @@ class DatabaseManager:
 
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or (Path.home() / '.claude' / 'context7_cache.db')
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._in_memory = str(self.db_path) == ':memory:'
+        # Session outcomes queued by session_tracker.py, kept next to the database
+        self.pending_outcomes_path = None if self._in_memory else self.db_path.parent / 'pending_outcomes.jsonl'
+        if not self._in_memory:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_database()
 
+    @staticmethod
+    def timestamp_cutoff(days: float = 0, minutes: float = 0) -> str:
+        """UTC cutoff in CURRENT_TIMESTAMP format, bound as a plain parameter against timestamp columns."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days, minutes=minutes)
+        return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        """Per-connection tuning so hook reads don't block on concurrent log writes."""
+        if self._in_memory:
+            return
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+
     @contextmanager
     def get_connection(self):
         """Provides a transactional database connection."""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        self._apply_pragmas(conn)
         try:
             yield conn
             conn.commit()
@@ -30,9 +74,20 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    @contextmanager
+    def write_txn(self):
+        """Provides a connection that holds the write lock until its writes are committed together."""
+        with self.get_connection() as conn:
+            # Take the lock up front so busy_timeout applies here rather than mid-transaction
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
     def _init_database(self):
         """Initializes the cache table if it doesn't exist."""
         with self.get_connection() as conn:
+            if not self._in_memory:
+                # journal_mode is persistent in the database file, so set it once here
+                conn.execute("PRAGMA journal_mode=WAL")
             conn.executescript('''
                 CREATE TABLE IF NOT EXISTS context_cache (
                     cache_key TEXT PRIMARY KEY,
@@ -44,7 +99,8 @@ class DatabaseManager:
                     last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     access_count INTEGER DEFAULT 0,
                     total_tokens INTEGER NOT NULL,
-                    expires_at TIMESTAMP NOT NULL
+                    expires_at TIMESTAMP NOT NULL,
+                    content_hash BLOB
                 );
                 CREATE INDEX IF NOT EXISTS idx_cache_framework ON context_cache(framework);
                 
@@ -71,19 +127,35 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_session_logs_session ON session_logs(session_id, timestamp);
                 CREATE INDEX IF NOT EXISTS idx_session_logs_cache_key ON session_logs(cache_key);
                 CREATE INDEX IF NOT EXISTS idx_session_logs_unanalyzed ON session_logs(analyzed_at) WHERE analyzed_at IS NULL;
+                CREATE INDEX IF NOT EXISTS idx_session_logs_op_ts ON session_logs(operation_type, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_session_logs_ts ON session_logs(timestamp, log_id);
+                CREATE INDEX IF NOT EXISTS idx_session_logs_ts_eff
+                    ON session_logs(timestamp, effectiveness_score, operation_type, cache_key, tokens_used);
             ''')
+            
+            # Databases created before content_hash existed get the column added
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(context_cache)")}
+            if 'content_hash' not in columns:
+                conn.execute("ALTER TABLE context_cache ADD COLUMN content_hash BLOB")
+            
+            # Older databases also carry usage_logs, which the Supabase sync pages through by timestamp
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_logs'").fetchone():
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_logs_ts ON usage_logs(timestamp, log_id)")
 
     def store_context(self, cache_key: str, framework: str, content: str, sections: Dict[str, str]):
         """Stores or replaces documentation in the cache."""
-        with self.get_connection() as conn:
+        with self.write_txn() as conn:
             expires_at = datetime.now() + timedelta(hours=24)
+            sections_json = json.dumps(sections)
             conn.execute('''
                 INSERT OR REPLACE INTO context_cache
-                (cache_key, framework, component, full_content, sections, total_tokens, expires_at, access_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE((SELECT access_count FROM context_cache WHERE cache_key = ?), 0))
+                (cache_key, framework, component, full_content, sections, total_tokens, expires_at,
+                 content_hash, access_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE((SELECT access_count FROM context_cache WHERE cache_key = ?), 0))
             ''', (
                 cache_key, framework, cache_key.split(':')[1] if ':' in cache_key else None,
-                content, json.dumps(sections), len(content.split()), expires_at, cache_key
+                content, sections_json, len(content.split()), expires_at,
+                compute_content_hash(content, sections_json), cache_key
             ))
             
             # Auto-sync to Supabase if configured (async, non-blocking)
@@ -92,6 +164,16 @@ class DatabaseManager:
     def get_cache_data(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Retrieves cached data, updating access metrics."""
         with self.get_connection() as conn:
+            if _HAS_RETURNING:
+                # Bump access metrics and fetch the row in a single statement
+                now = datetime.now()
+                row = conn.execute(
+                    "UPDATE context_cache SET last_accessed = ?, access_count = access_count + 1 "
+                    "WHERE cache_key = ? AND expires_at > ? RETURNING *",
+                    (now, cache_key, now)
+                ).fetchone()
+                return dict(row) if row else None
+
             row = conn.execute(
                 "SELECT * FROM context_cache WHERE cache_key = ? AND expires_at > ?",
                 (cache_key, datetime.now())
@@ -132,6 +214,59 @@ class DatabaseManager:
                 WHERE log_id = ?
             ''', (session_complete, json.dumps(follow_up_actions) if follow_up_actions else None, log_id))
 
+    def update_session_outcomes(self, outcomes: List[Tuple[int, bool, Optional[list]]]) -> None:
+        """Update several session logs with outcome data in one transaction.
+        
+        outcomes holds (log_id, session_complete, follow_up_actions); if a log_id
+        appears more than once, the last outcome wins.
+        """
+        latest = {log_id: (complete, json.dumps(actions) if actions else None)
+                  for log_id, complete, actions in outcomes}
+        if not latest:
+            return
+        
+        params = [(log_id, complete, actions) for log_id, (complete, actions) in latest.items()]
+        with self.write_txn() as conn:
+            if _HAS_UPDATE_FROM:
+                values = ', '.join(['(?, ?, ?)'] * len(params))
+                conn.execute(f'''
+                    UPDATE session_logs
+                    SET session_complete = v.column2, follow_up_actions = v.column3
+                    FROM (VALUES {values}) AS v
+                    WHERE session_logs.log_id = v.column1
+                ''', [value for row in params for value in row])
+            else:
+                conn.executemany('''
+                    UPDATE session_logs
+                    SET session_complete = ?, follow_up_actions = ?
+                    WHERE log_id = ?
+                ''', [(complete, actions, log_id) for log_id, complete, actions in params])
+
+    def flush_pending_outcomes(self) -> int:
+        """Write every queued session outcome; returns how many were written.
+        
+        Run before analyzing sessions, so none is scored before its outcome lands.
+        """
+        # POSIX-only, like the session tracker hook that fills the queue
+        import fcntl
+        
+        if self.pending_outcomes_path is None:
+            return 0
+        try:
+            f = open(self.pending_outcomes_path, 'r+')
+        except FileNotFoundError:
+            return 0
+        with f:
+            # Held through the write, so the queue is only emptied once its outcomes are stored
+            fcntl.flock(f, fcntl.LOCK_EX)
+            pending = parse_pending_outcomes(f.read())
+            if pending:
+                self.update_session_outcomes(
+                    [(item['log_id'], item['success'], item['actions']) for item in pending]
+                )
+            f.truncate(0)
+        return len(pending)
+
     def update_effectiveness_analysis(self, log_id: int, effectiveness_score: float,
                                     effectiveness_reason: str, confidence_score: float) -> None:
         """Update a session log with LLM effectiveness analysis."""
@@ -142,6 +277,24 @@ class DatabaseManager:
                     confidence_score = ?, analyzed_at = ?
                 WHERE log_id = ?
             ''', (effectiveness_score, effectiveness_reason, confidence_score, datetime.now(), log_id))
+
+    def update_effectiveness_analyses(self, analyses: List[Tuple[int, float, str, float]]) -> None:
+        """Update several session logs with effectiveness analysis in one transaction.
+        
+        analyses holds (log_id, effectiveness_score, effectiveness_reason, confidence_score).
+        """
+        if not analyses:
+            return
+        
+        analyzed_at = datetime.now()
+        with self.write_txn() as conn:
+            conn.executemany('''
+                UPDATE session_logs 
+                SET effectiveness_score = ?, effectiveness_reason = ?, 
+                    confidence_score = ?, analyzed_at = ?
+                WHERE log_id = ?
+            ''', [(score, reason, confidence, analyzed_at, log_id)
+                  for log_id, score, reason, confidence in analyses])
     
     def update_session_intelligence(self, log_id: int, was_effective: bool, 
                                   reasoning: str, confidence: float, rule_updated: bool):
@@ -170,10 +323,10 @@ class DatabaseManager:
             rows = conn.execute('''
                 SELECT * FROM session_logs 
                 WHERE analyzed_at IS NULL 
-                AND timestamp < datetime('now', '-5 minutes')
+                AND timestamp < ?
                 ORDER BY timestamp ASC 
                 LIMIT ?
-            ''', (limit,)).fetchall()
+            ''', (self.timestamp_cutoff(minutes=5), limit)).fetchall()
             return [dict(row) for row in rows]
 
     def get_effectiveness_insights(self, days: int = 7) -> dict:
@@ -190,12 +343,12 @@ class DatabaseManager:
                 FROM session_logs l
                 JOIN context_cache c ON l.cache_key = c.cache_key
                 JOIN json_each(l.sections_provided)
-                WHERE l.timestamp > datetime('now', '-' || ? || ' days')
+                WHERE l.timestamp > ?
                   AND l.effectiveness_score IS NOT NULL
                 GROUP BY 1, 2, 3
                 HAVING usage_count >= 3
                 ORDER BY avg_effectiveness DESC
-            ''', (days,)).fetchall()
+            ''', (self.timestamp_cutoff(days),)).fetchall()
             
             insights = {}
             for row in results:
@@ -206,6 +359,41 @@ class DatabaseManager:
             return insights
     
     
+    def get_cache_stats(self, days: int = 7) -> dict:
+        """Get cache entries per framework and recent usage per operation in one query."""
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                WITH cache_agg AS (
+                    SELECT 'cache' AS kind, framework AS name,
+                           COUNT(*) AS total, NULL AS successful
+                    FROM context_cache
+                    GROUP BY framework
+                ),
+                usage_agg AS (
+                    SELECT 'usage' AS kind, operation_type AS name,
+                           COUNT(*) AS total,
+                           SUM(CASE WHEN session_complete = 1 THEN 1 ELSE 0 END) AS successful
+                    FROM session_logs
+                    WHERE timestamp > ?
+                    GROUP BY operation_type
+                )
+                SELECT * FROM cache_agg
+                UNION ALL
+                SELECT * FROM usage_agg
+            ''', (self.timestamp_cutoff(days),))
+
+            stats = {'cache': [], 'usage': []}
+            for kind, name, total, successful in rows:
+                if kind == 'cache':
+                    stats['cache'].append({'framework': name, 'framework_count': total})
+                else:
+                    stats['usage'].append({
+                        'operation_type': name,
+                        'total_requests': total,
+                        'successful_requests': successful
+                    })
+            return stats
+
     def _sync_cache_to_supabase_async(self, cache_key: str):
         """Sync cache entry to Supabase asynchronously (non-blocking)"""
         import threading
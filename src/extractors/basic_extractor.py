@@ -1,28 +1,33 @@
 # ~/projects/cc-rag/src/extractors/basic_extractor.py
 import re
 import json
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+_HEADER_RE = re.compile(r'^#+\s*(.+)$')
 
 class BasicSectionExtractor:
     """Extracts and selects relevant sections from documentation."""
 
     def extract_sections(self, content: str) -> Dict[str, str]:
         """Parses content into a dictionary of named sections."""
-        sections = {}
+        return dict(self.extract_sections_stream(content.split('\n')))
+
+    def extract_sections_stream(self, lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Yields (section_name, section_text) pairs as each header boundary is reached."""
         current_section = 'overview'
         current_content = []
-        for line in content.split('\n'):
-            match = re.match(r'^#+\s*(.+)$', line)
+        for line in lines:
+            line = line.rstrip('\n')
+            match = _HEADER_RE.match(line)
             if match:
                 if current_content:
-                    sections[current_section] = '\n'.join(current_content).strip()
+                    yield current_section, '\n'.join(current_content).strip()
                 current_section = self._normalize_section_name(match.group(1))
                 current_content = []
             else:
                 current_content.append(line)
         if current_content:
-            sections[current_section] = '\n'.join(current_content).strip()
-        return sections
+            yield current_section, '\n'.join(current_content).strip()
 
     def _normalize_section_name(self, name: str) -> str:
         """Converts header names to a consistent snake_case format."""
@@ -181,7 +181,7 @@ class SelfHealingManager:
                 # Update the entry with fixed JSON
                 conn.execute('''
                     UPDATE context_cache 
-                    SET sections = ? 
+                    SET sections = ?, content_hash = NULL
                     WHERE cache_key = ?
                 ''', (fixed_json, entry["cache_key"]))
                 return True
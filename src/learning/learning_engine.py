@@ -25,6 +25,9 @@ class LearningEngine:
         
         # First, process any unanalyzed sessions
         processed_sessions = self.analyzer.process_unanalyzed_sessions(50)
+        if processed_sessions:
+            # New effectiveness scores change the sequence patterns
+            self.pattern_analyzer.invalidate()
         
         # Analyze operation patterns for predictive insights
         pattern_analysis = self.pattern_analyzer.analyze_operation_sequences(days * 2)  # Longer period for patterns
@@ -59,8 +62,9 @@ class LearningEngine:
         """Generate optimized rules based on effectiveness insights, patterns, and user style."""
         new_rules = {}
         
-        for framework_op, sections_data in insights.items():
-            framework, operation = framework_op.split(':', 1)
+        for sections_data in insights.values():
+            # Every row of a group carries its framework and operation
+            framework, operation = sections_data[0]['framework'], sections_data[0]['operation_type']
             
             # Filter for high-performing sections (lowered threshold temporarily)
             # TODO: Raise back to 0.6 once we have better effectiveness data
@@ -278,7 +282,8 @@ class LearningEngine:
             
             # Count total sessions in last 7 days
             recent_sessions = conn.execute(
-                "SELECT COUNT(*) as count FROM session_logs WHERE timestamp > datetime('now', '-7 days')"
+                "SELECT COUNT(*) as count FROM session_logs WHERE timestamp > ?",
+                (self.db.timestamp_cutoff(7),)
             ).fetchone()['count']
             
             # Average effectiveness score